@@ -0,0 +1,260 @@
+"""
+Headless JSON API over the planner, for clients that cannot drive the Streamlit UI.
+
+    python api.py --port 8080
+
+    POST /itinerary          {"destination": "Goa", "duration": 3, "max_budget": 20000, "travelers": 2,
+                              "trip_type": "Couple", "interests": ["Food"], "start_date": "2025-01-10"}
+    GET  /logistics?origin=Delhi&destination=Goa
+    GET  /places?q=man
+    POST /users              {"username": ..., "password": ...}
+    GET  /history?limit=20&before=<next>          (HTTP Basic auth for everything below)
+    GET  /history/search?q=beach
+    POST /trips              {"destination": ..., "trip": <itinerary>}
+    GET  /trips/<id>
+    PUT  /trips/<id>/note    {"note": ...}
+    GET  /health, /metrics
+
+Itineraries come back exactly as the app stores them. The blocking work (LLM calls, geocoding,
+SQLite) runs on two bounded thread pools; when a pool's queue is full the API answers 503 at once,
+and a call that outlives its timeout answers 504.
+"""
+import argparse
+import asyncio
+import base64
+import concurrent.futures as cf
+import json
+import logging
+import os
+from datetime import date
+from aiohttp import web
+from src import db, metrics
+from src.ai_engine import configure_genai, generate_itinerary
+from src.health import HEALTH
+from src.models import budget_tier
+from src.navigation import get_place_suggestions, get_trip_logistics
+
+LLM_WORKERS = int(os.getenv("WANDERLUST_API_LLM_WORKERS", "8"))
+IO_WORKERS = int(os.getenv("WANDERLUST_API_IO_WORKERS", "16"))
+QUEUE_LIMIT = int(os.getenv("WANDERLUST_API_QUEUE", "64"))          # waiting calls per pool before 503
+ITINERARY_TIMEOUT = float(os.getenv("WANDERLUST_API_TIMEOUT", "90"))  # providers race for up to 60 s, then fallback
+IO_TIMEOUT = float(os.getenv("WANDERLUST_API_IO_TIMEOUT", "15"))
+
+# Same choices and limits as the app's form
+TRIP_TYPES = ("Solo", "Couple", "Family", "Friends")
+BUDGETS = ("Cheap", "Mid", "Lux")
+HISTORY_COLUMNS = ("id", "destination", "title", "duration", "total_cost", "notes", "created_at")
+SEARCH_COLUMNS = ("id", "destination", "title", "duration", "total_cost", "snippet", "created_at")
+
+class Pool:
+    """
+    Thread pool with admission control: `workers` calls run, up to `queue` more wait, the rest are
+    refused. A slot is held until the thread really finishes, even when the caller has timed out.
+    """
+
+    def __init__(self, name, workers, queue):
+        self.name, self.limit = name, workers + queue
+        self.executor = cf.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"api-{name}")
+        self.inflight = 0   # only touched on the event loop thread
+
+    def _release(self, _):
+        self.inflight -= 1
+
+    async def run(self, fn, *args, timeout):
+        if self.inflight >= self.limit:
+            metrics.inc("wanderlust_api_rejected_total", pool=self.name)
+            raise web.HTTPServiceUnavailable(reason=f"{self.name} pool busy", headers={"Retry-After": "5"})
+        loop = asyncio.get_running_loop()
+        self.inflight += 1
+        fut = self.executor.submit(fn, *args)
+        fut.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), timeout)
+        except asyncio.TimeoutError:
+            fut.cancel()  # only stops it if it never started
+            metrics.inc("wanderlust_api_timeouts_total", pool=self.name)
+            raise web.HTTPGatewayTimeout(reason=f"no answer within {timeout:g} s")
+
+def dumps(data): return json.dumps(data, ensure_ascii=False)
+
+def reply(data, status=200): return web.json_response(data, status=status, dumps=dumps)
+
+@web.middleware
+async def json_errors(request, handler):
+    """Every error is {"error": ...} JSON with the right status, and each request is timed per route."""
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unmatched"
+    with metrics.timed(f"api {request.method} {route}"):
+        try:
+            return await handler(request)
+        except web.HTTPException as e:
+            if e.status < 400: raise
+            return web.json_response({"error": e.reason}, status=e.status, headers={k: v for k, v in e.headers.items()
+                                                                                    if k in ("Retry-After", "WWW-Authenticate")})
+        except Exception:
+            logging.exception("api %s %s failed", request.method, request.path)
+            return reply({"error": "internal error"}, 500)
+
+async def body_json(request):
+    try: body = await request.json()
+    except (ValueError, UnicodeDecodeError): raise web.HTTPBadRequest(reason="body must be JSON")
+    if not isinstance(body, dict): raise web.HTTPBadRequest(reason="body must be a JSON object")
+    return body
+
+def _int(body, name, default, lo, hi):
+    try: v = int(body.get(name, default))
+    except (TypeError, ValueError): raise web.HTTPBadRequest(reason=f"{name} must be an integer")
+    if not lo <= v <= hi: raise web.HTTPBadRequest(reason=f"{name} must be between {lo} and {hi}")
+    return v
+
+def itinerary_args(body):
+    """Request body -> generate_itinerary's positional arguments, with the app's defaults."""
+    destination = str(body.get("destination") or "").strip()
+    if not destination: raise web.HTTPBadRequest(reason="destination is required")
+    duration = _int(body, "duration", 3, 1, 10)
+    max_budget = _int(body, "max_budget", 20000, 5000, 2000000)
+    travelers = _int(body, "travelers", 1, 1, 10)
+    trip_type = body.get("trip_type", "Solo")
+    if trip_type not in TRIP_TYPES: raise web.HTTPBadRequest(reason=f"trip_type must be one of {', '.join(TRIP_TYPES)}")
+    budget = body.get("budget") or budget_tier(max_budget)
+    if budget not in BUDGETS: raise web.HTTPBadRequest(reason=f"budget must be one of {', '.join(BUDGETS)}")
+    interests = body.get("interests", ["Food"])
+    if not isinstance(interests, list) or not all(isinstance(i, str) for i in interests):
+        raise web.HTTPBadRequest(reason="interests must be a list of strings")
+    start_date = body.get("start_date")
+    if start_date is not None:
+        try: start_date = date.fromisoformat(start_date)  # a date, as the app's date picker passes
+        except (TypeError, ValueError): raise web.HTTPBadRequest(reason="start_date must be an ISO date (YYYY-MM-DD)")
+    return destination, start_date, duration, budget, max_budget, travelers, trip_type, interests
+
+def basic_auth(header):
+    """'Basic dTE6cHc=' -> ('u1', 'pw'); None for anything else."""
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "basic": return None
+    try: login, sep, password = base64.b64decode(token.strip(), validate=True).decode("utf-8").partition(":")
+    except (ValueError, UnicodeDecodeError): return None
+    return (login, password) if sep else None
+
+async def user_of(request):
+    """HTTP Basic credentials checked against the users table -> username, else 401."""
+    auth = basic_auth(request.headers.get("Authorization", ""))
+    if auth is None or not await request.app["io"].run(db.check_login, *auth, timeout=IO_TIMEOUT):
+        raise web.HTTPUnauthorized(reason="valid credentials required", headers={"WWW-Authenticate": 'Basic realm="wanderlust"'})
+    return auth[0]
+
+# --- Handlers ---
+
+async def itinerary(request):
+    args = itinerary_args(await body_json(request))
+    return reply(await request.app["llm"].run(generate_itinerary, *args, timeout=ITINERARY_TIMEOUT))
+
+async def logistics(request):
+    origin, destination = request.query.get("origin", "").strip(), request.query.get("destination", "").strip()
+    if not origin or not destination: raise web.HTTPBadRequest(reason="origin and destination are required")
+    result = await request.app["io"].run(get_trip_logistics, origin, destination, timeout=IO_TIMEOUT)
+    if result is None: raise web.HTTPNotFound(reason="could not locate origin or destination")
+    return reply(result)
+
+async def places(request):
+    q = request.query.get("q", "")
+    return reply({"suggestions": await request.app["io"].run(get_place_suggestions, q, timeout=IO_TIMEOUT)})
+
+async def create_user(request):
+    body = await body_json(request)
+    username, password = str(body.get("username") or "").strip(), str(body.get("password") or "")
+    if not username or not password: raise web.HTTPBadRequest(reason="username and password are required")
+    if not await request.app["io"].run(db.add_user, username, password, timeout=IO_TIMEOUT):
+        raise web.HTTPConflict(reason="username taken")
+    return reply({"username": username}, 201)
+
+def _cursor(text):
+    """'<created_at>|<id>' (the `next` of the previous page) -> get_history_page's `before`."""
+    if not text: return None
+    created, _, tid = text.rpartition("|")
+    if not created or not tid.isdigit(): raise web.HTTPBadRequest(reason="bad cursor")
+    return created, int(tid)
+
+async def history(request):
+    user = await user_of(request)
+    limit = _int(request.query, "limit", 20, 1, 100)
+    rows, nxt = await request.app["io"].run(db.get_history_page, user, _cursor(request.query.get("before")), limit,
+                                            timeout=IO_TIMEOUT)
+    return reply({"trips": [dict(zip(HISTORY_COLUMNS, r)) for r in rows], "next": f"{nxt[0]}|{nxt[1]}" if nxt else None})
+
+async def search(request):
+    user = await user_of(request)
+    q, limit = request.query.get("q", ""), _int(request.query, "limit", 20, 1, 100)
+    rows = await request.app["io"].run(db.search_trips, user, q, limit, timeout=IO_TIMEOUT)
+    return reply({"trips": [dict(zip(SEARCH_COLUMNS, r)) for r in rows]})
+
+def _trip_id(request):
+    tid = request.match_info["trip_id"]
+    if not tid.isdigit(): raise web.HTTPNotFound(reason="no such trip")
+    return int(tid)
+
+async def save(request):
+    user, body = await user_of(request), await body_json(request)
+    destination, trip = str(body.get("destination") or "").strip(), body.get("trip")
+    if not destination or not isinstance(trip, dict) or not trip.get("days"):
+        raise web.HTTPBadRequest(reason="destination and an itinerary with days are required")
+    await request.app["io"].run(db.save_trip, user, destination, trip, timeout=IO_TIMEOUT)
+    return reply({"saved": True}, 201)
+
+async def trip(request):
+    user = await user_of(request)
+    data = await request.app["io"].run(db.get_trip, _trip_id(request), user, timeout=IO_TIMEOUT)
+    if data is None: raise web.HTTPNotFound(reason="no such trip")
+    return reply(data)
+
+async def note(request):
+    user, body = await user_of(request), await body_json(request)
+    tid, text = _trip_id(request), str(body.get("note") or "")
+    io = request.app["io"]
+    if await io.run(db.get_trip, tid, user, timeout=IO_TIMEOUT) is None: raise web.HTTPNotFound(reason="no such trip")
+    await io.run(db.update_note, tid, text, user, timeout=IO_TIMEOUT)
+    return reply({"id": tid, "note": text})
+
+async def health(request):
+    return reply({"status": "ok", "providers": HEALTH.snapshot(),
+                  "pools": {p.name: {"inflight": p.inflight, "limit": p.limit} for p in (request.app["llm"], request.app["io"])}})
+
+async def metrics_text(request):
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+# --- App ---
+
+async def _startup(app):
+    await app["io"].run(db.init_db, timeout=60)
+    configure_genai()
+
+async def _cleanup(app):
+    for pool in (app["llm"], app["io"]): pool.executor.shutdown(wait=False, cancel_futures=True)
+    db.flush_writes()
+
+def make_app(llm_workers=LLM_WORKERS, io_workers=IO_WORKERS, queue=QUEUE_LIMIT):
+    app = web.Application(middlewares=[json_errors], client_max_size=1024 ** 2)
+    app["llm"] = Pool("llm", llm_workers, queue)
+    app["io"] = Pool("io", io_workers, queue)
+    app.router.add_post("/itinerary", itinerary)
+    app.router.add_get("/logistics", logistics)
+    app.router.add_get("/places", places)
+    app.router.add_post("/users", create_user)
+    app.router.add_get("/history", history)
+    app.router.add_get("/history/search", search)
+    app.router.add_post("/trips", save)
+    app.router.add_get("/trips/{trip_id}", trip)
+    app.router.add_put("/trips/{trip_id}/note", note)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics_text)
+    app.on_startup.append(_startup)
+    app.on_cleanup.append(_cleanup)
+    return app
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Headless JSON API for itineraries, logistics, places and trip history.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    args = p.parse_args(argv)
+    web.run_app(make_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,25 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import time
-import json
-import re
 from datetime import date
-from src.ai_engine import configure_genai, generate_itinerary, ask_travel_bot
+from src.ai_engine import configure_genai, generate_itinerary, stream_itinerary, STREAM_MODE
 from src.navigation import get_trip_logistics, get_place_suggestions
-from src.db import init_db, add_user, check_login, save_trip, get_history, update_note
+from src.models import Itinerary, budget_tier
+from src.chat import TravelChat, trip_hash
+from src.map_engine import itinerary_map_html
+from src.metrics import profiled, start_exporter
+from src.db import init_db, add_user, check_login, save_trip, get_history_page, get_trip, search_trips, update_note
 
 st.set_page_config(page_title="Wanderlust AI", layout="wide", page_icon="✈️")
-init_db()
+
+@st.cache_resource(show_spinner=False)
+def setup():
+    """Once per server process, not on every rerun: schema checks/migrations and the metrics exporter (if configured)."""
+    init_db()
+    start_exporter()
+    return True
+
+setup()
+HISTORY_PAGE = 10  # trips per sidebar page
 
 st.markdown("""
 <style>
@@ -21,6 +31,13 @@ st.markdown("""
         -webkit-text-fill-color: transparent;
         animation: fadeIn 3s;
     }
+    .splash {
+        position: fixed; inset: 0; z-index: 999999; background: #0e1117; pointer-events: none;
+        display: flex; flex-direction: column; justify-content: center;
+        animation: splashOut 0.6s ease-in 1.4s forwards;
+    }
+    @keyframes fadeIn {from {opacity: 0;} to {opacity: 1;}}
+    @keyframes splashOut {to {opacity: 0; visibility: hidden;}}
     .transport-card {
         border: 1px solid #444; border-radius: 8px; padding: 10px; margin: 5px; background: #222; text-align: center;
     }
@@ -38,11 +55,102 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def parse_cost(cost_str):
-    if not cost_str: return 0
-    match = re.search(r"₹([\d,]+)", str(cost_str))
-    if match: return int(match.group(1).replace(",", ""))
-    return 0
+def set_trip(trip_data):
+    # Normalise once: the results page only reads the typed model (costs already parsed)
+    st.session_state['trip_data'] = trip_data
+    st.session_state['trip'] = Itinerary.from_dict(trip_data)
+    st.session_state['trip_id'] = tid = trip_hash(trip_data)
+    # Every activity starts selected; from here on the total only moves by one cost per toggle
+    for k in [k for k in st.session_state if str(k).startswith(f"sel_{tid}_")]: del st.session_state[k]
+    costs = st.session_state['trip'].activity_costs()
+    st.session_state['selected_activities'] = dict.fromkeys(costs, True)
+    st.session_state['budget_total'] = sum(costs.values())
+
+def toggle_activity(key, widget_key, cost):
+    selected = st.session_state[widget_key]
+    st.session_state['selected_activities'][key] = selected
+    st.session_state['budget_total'] += cost if selected else -cost
+
+def budget_card(slot, budget, travelers):
+    total = st.session_state['budget_total']
+    status = "over-budget" if total > budget else "under-budget"
+    per_person = int(total / travelers)
+    slot.markdown(f"""
+    <div class='cost-card {status}'>
+       <h3>₹{total:,}</h3>
+       <p>Total / ₹{budget:,}</p>
+       <hr style='border-color:#444;'>
+       <b>₹{per_person:,}</b> / person
+    </div>
+    """, unsafe_allow_html=True)
+
+# Fragments: a checkbox click, chat message or tab interaction reruns only its own block,
+# not the sidebar history query, place suggestions or map embeds around it.
+@st.fragment
+def itinerary_view(trip, tid, budget_slot, budget, travelers):
+    st.subheader("📅 Your Schedule")
+    selected = st.session_state['selected_activities']
+    for day in trip.days:
+        with st.expander(f"Day {day.day}", expanded=(day.day==1)):
+            for idx, act in enumerate(day.activities):
+                c1, c2, c3 = st.columns([0.5, 3.5, 1])
+                key = f"{day.day}_{idx}"
+                widget_key = f"sel_{tid}_{key}"  # per trip, so another trip's ticks never leak in
+                is_sel = c1.checkbox("", value=selected.get(key, True), key=widget_key,
+                                     on_change=toggle_activity, args=(key, widget_key, act.cost_inr))
+                op = "1" if is_sel else "0.5"
+                c2.markdown(f"<div style='opacity:{op}'><b>{act.time}</b>: {act.activity}</div>", unsafe_allow_html=True)
+                c2.caption(act.description)
+                c3.markdown(f"<div style='opacity:{op}'><b>{act.cost}</b></div>", unsafe_allow_html=True)
+    # The card sits above the maps, outside this fragment; its placeholder is refreshed in place
+    budget_card(budget_slot, budget, travelers)
+
+@st.fragment
+def recommendations(items, kind, city):
+    for item in items:
+        with st.container(border=True):
+            c1, c2 = st.columns([3, 1])
+            c1.markdown(f"**{item.name}**")
+            if kind == "hotel":
+                c1.caption(f"📍 {item.location} | ⭐ {item.rating or '4.5'}")
+                c2.markdown(f"**{item.price_per_night}**")
+            else:
+                c1.caption(f"🥘 {item.type}")
+                c2.markdown(f"**{item.price}**")
+            search = f"{item.name} {city} {kind}"
+            c2.link_button("Map", f"https://www.google.com/maps/search/?api=1&query={search.replace(' ','+')}")
+
+@st.fragment
+def chat_view(trip, tid):
+    st.write("Ask questions about this trip:")
+    # One session per trip; the form only fires on submit, not on every rerun
+    chats = st.session_state.setdefault('chats', {})
+    if tid not in chats: chats[tid] = TravelChat(tid, trip)
+    session = chats[tid]
+    log = st.container()
+    with st.form("chat_form", clear_on_submit=True):
+        q = st.text_input("Example: Is it safe at night?")
+        if st.form_submit_button("Ask") and q: session.ask(q)
+    with log:
+        for role, text in session.turns: st.chat_message(role).write(text)
+
+def render_stream(events):
+    # Progressive preview: each day / hotel / restaurant is drawn as soon as it is complete
+    live = st.empty()
+    box = live.container()
+    for kind, payload in events:
+        if kind == "reset": box = live.container()  # provider switched mid-stream, start over
+        elif kind == "field" and "trip_title" in payload: box.subheader(payload["trip_title"])
+        elif kind == "day":
+            with box.expander(f"Day {payload.get('day')}", expanded=True):
+                for act in payload.get('activities', []):
+                    st.markdown(f"<b>{act.get('time')}</b>: {act.get('activity')} <span class='auto-tag'>{act.get('cost')}</span>", unsafe_allow_html=True)
+        elif kind == "hotel": box.caption(f"🏨 {payload.get('name')} | {payload.get('price_per_night')}")
+        elif kind == "dining": box.caption(f"🥘 {payload.get('name')} | {payload.get('price')}")
+        elif kind == "done":
+            live.empty()
+            return payload
+    return {"error": "No itinerary"}
 
 if 'user' not in st.session_state:
     if "user" in st.query_params:
@@ -50,22 +158,17 @@ if 'user' not in st.session_state:
         st.session_state['page'] = 'home'
     else:
         st.session_state['user'] = None
-        st.session_state['page'] = 'splash'
+        st.session_state['page'] = 'login'
+        st.session_state['splash'] = True
 
 # --- SPLASH ---
-if st.session_state['page'] == 'splash':
-    empty = st.empty()
-    with empty.container():
-        st.markdown("<br><br><br>", unsafe_allow_html=True)
-        st.markdown('<p class="title-animate">WANDERLUST AI</p>', unsafe_allow_html=True)
-        st.markdown("<center>Your AI-Powered Travel Architect</center>", unsafe_allow_html=True)
-    time.sleep(2)
-    empty.empty()
-    st.session_state['page'] = 'login'
-    st.rerun()
+# A CSS overlay that fades out in the browser; the login page underneath is already rendered
+if st.session_state.pop('splash', False):
+    st.markdown('<div class="splash"><p class="title-animate">WANDERLUST AI</p>'
+                '<center>Your AI-Powered Travel Architect</center></div>', unsafe_allow_html=True)
 
 # --- LOGIN ---
-elif st.session_state['page'] == 'login':
+if st.session_state['page'] == 'login':
     c1, c2, c3 = st.columns([1, 2, 1])
     with c2:
         st.title("✈️ Start Journey")
@@ -94,16 +197,32 @@ elif st.session_state['page'] == 'home':
         if st.button("Log Out"):
             st.session_state['user'] = None
             st.session_state['page'] = 'login'
+            st.session_state.pop('history_cursors', None)
             st.query_params.clear()
             st.rerun()
         st.divider()
         st.subheader("📜 History")
-        for row in get_history(st.session_state['user']):
-            tid, dest, djson, note, date_c = row
+        q = st.text_input("Search trips", key="history_q", placeholder="e.g. river cruise")
+        if q:
+            rows, older = search_trips(st.session_state['user'], q, limit=HISTORY_PAGE), None
+            if not rows: st.caption("No matching trips.")
+        else:
+            # Keyset pages: a stack of cursors, None = newest page
+            cursors = st.session_state.setdefault('history_cursors', [None])
+            rows, older = get_history_page(st.session_state['user'], before=cursors[-1], limit=HISTORY_PAGE)
+        for tid, dest, title, days, cost, snippet, date_c in rows:
             with st.expander(f"{dest}"):
+                if title: st.caption(title)
+                st.caption(f"{days or '?'} days · ₹{cost or 0:,} · {str(date_c)[:10]}")
+                if q: st.markdown(snippet)
                 if st.button("View Plan", key=f"l_{tid}"):
-                    st.session_state['trip_data'] = json.loads(djson)
+                    trip_data = get_trip(tid, st.session_state['user'])
+                    if trip_data: set_trip(trip_data)
                     st.rerun()
+        if not q:
+            h1, h2 = st.columns(2)
+            if len(cursors) > 1: h1.button("← Newer", on_click=cursors.pop)
+            if older: h2.button("Older →", on_click=cursors.append, args=(older,))
 
     st.title("🌍 Plan Your Next Adventure")
     
@@ -111,10 +230,12 @@ elif st.session_state['page'] == 'home':
         c1, c2 = st.columns(2)
         with c1:
             ro = st.text_input("From", key="o")
-            fo = st.selectbox("Confirm", get_place_suggestions(ro), index=0) if ro and get_place_suggestions(ro) else ro
+            so = get_place_suggestions(ro) if ro else []
+            fo = st.selectbox("Confirm", so, index=0) if so else ro
         with c2:
             rd = st.text_input("To", key="d")
-            fd = st.selectbox("Confirm", get_place_suggestions(rd), index=0) if rd and get_place_suggestions(rd) else rd
+            sd_ = get_place_suggestions(rd) if rd else []
+            fd = st.selectbox("Confirm", sd_, index=0) if sd_ else rd
             
         c3, c4, c5 = st.columns(3)
         sd = c3.date_input("Start Date")
@@ -124,15 +245,8 @@ elif st.session_state['page'] == 'home':
         # No more slider. We calculate style from the Max Budget amount.
         max_budget = c5.number_input("Total Trip Budget (₹)", 5000, 2000000, 20000, 1000)
         
-        if max_budget < 30000:
-            bud_type = "Cheap"
-            bud_icon = "🎒 Backpacker Style"
-        elif max_budget < 100000:
-            bud_type = "Mid"
-            bud_icon = "⚖️ Standard Comfort"
-        else:
-            bud_type = "Lux"
-            bud_icon = "💎 Luxury Experience"
+        bud_type = budget_tier(max_budget)
+        bud_icon = {"Cheap": "🎒 Backpacker Style", "Mid": "⚖️ Standard Comfort", "Lux": "💎 Luxury Experience"}[bud_type]
             
         # Show the detected style to the user
         c5.markdown(f"**Detected Style:** {bud_icon}")
@@ -145,19 +259,21 @@ elif st.session_state['page'] == 'home':
         
         if st.button("🚀 Generate Itinerary", type="primary"):
             if fd and fo:
-                with st.spinner("Analyzing routes, costs, and places..."):
+                # WANDERLUST_PROFILE=1 (server side only) writes a cProfile dump of each generation
+                with st.spinner("Analyzing routes, costs, and places..."), profiled("generate"):
                     configure_genai()
-                    st.session_state['selected_activities'] = {}
                     
                     # 1. AI (or Static Fallback) - Passing the AUTO DETECTED 'bud_type'
-                    trip_data = generate_itinerary(fd, sd, dur, bud_type, max_budget, travelers, trip_type, intr)
+                    if STREAM_MODE: trip_data = render_stream(stream_itinerary(fd, sd, dur, bud_type, max_budget, travelers, trip_type, intr))
+                    else: trip_data = generate_itinerary(fd, sd, dur, bud_type, max_budget, travelers, trip_type, intr)
                     
                     # 2. Logistics (Math)
                     logistics = get_trip_logistics(fo, fd)
                     
                     if "error" not in trip_data:
                         save_trip(st.session_state['user'], fd, trip_data)
-                        st.session_state['trip_data'] = trip_data
+                        st.session_state['history_cursors'] = [None]
+                        set_trip(trip_data)
                         st.session_state['logistics'] = logistics
                         st.session_state['travelers'] = travelers
                         st.rerun()
@@ -166,11 +282,13 @@ elif st.session_state['page'] == 'home':
     # --- RESULTS ---
     if 'trip_data' in st.session_state:
         data = st.session_state['trip_data']
+        if 'budget_total' not in st.session_state: set_trip(data)
+        trip = st.session_state['trip']
         logistics = st.session_state.get('logistics')
         travelers_count = st.session_state.get('travelers', 1)
         
         st.divider()
-        st.header(data.get('trip_title', f"Trip to {fd}"))
+        st.header(trip.trip_title or f"Trip to {fd}")
         
         # LOGISTICS
         if logistics:
@@ -182,74 +300,29 @@ elif st.session_state['page'] == 'home':
             with lc4: st.markdown(f"<div class='transport-card'>🚗 <b>Car</b><br>₹{logistics['costs']['car']['inr']:,}<br><small>{logistics['times']['car']}</small></div>", unsafe_allow_html=True)
             st.caption(f"📍 Distance: {logistics['distance_km']:,} km")
 
-        # BUDGET
-        if 'selected_activities' not in st.session_state: st.session_state['selected_activities'] = {}
-        curr_total = 0
-        for day in data.get('days', []):
-            for i, act in enumerate(day['activities']):
-                key = f"{day['day']}_{i}"
-                if key not in st.session_state['selected_activities']: st.session_state['selected_activities'][key] = True
-                if st.session_state['selected_activities'][key]: curr_total += parse_cost(act.get('cost'))
-        
+        # BUDGET (drawn by the itinerary fragment, which keeps it in step with the checkboxes)
         # Ensure we don't divide by zero if max_budget is missing somehow
         safe_budget = max_budget if 'max_budget' in locals() else 50000
-        
-        delta = safe_budget - curr_total
-        status = "over-budget" if delta < 0 else "under-budget"
-        per_person = int(curr_total / travelers_count)
-        
         c_head, c_cost = st.columns([3, 1])
-        with c_cost:
-             st.markdown(f"""
-             <div class='cost-card {status}'>
-                <h3>₹{curr_total:,}</h3>
-                <p>Total / ₹{safe_budget:,}</p>
-                <hr style='border-color:#444;'>
-                <b>₹{per_person:,}</b> / person
-             </div>
-             """, unsafe_allow_html=True)
+        budget_slot = c_cost.empty()
 
         # MAP (Unblockable Embed)
         if fo and fd:
             embed_url = f"https://maps.google.com/maps?saddr={fo.replace(' ','+')}&daddr={fd.replace(' ','+')}&output=embed"
             components.iframe(src=embed_url, height=400)
 
+        # ACTIVITY MAP (memoised per itinerary, so reruns and history views skip the rebuild)
+        with st.expander("🗺️ Activity Map"):
+            components.html(itinerary_map_html(data), height=450)
+
         # ITINERARY
-        st.subheader("📅 Your Schedule")
-        for day in data.get('days', []):
-            with st.expander(f"Day {day['day']}", expanded=(day['day']==1)):
-                for idx, act in enumerate(day['activities']):
-                    c1, c2, c3 = st.columns([0.5, 3.5, 1])
-                    key = f"{day['day']}_{idx}"
-                    is_sel = c1.checkbox("", value=st.session_state['selected_activities'].get(key, True), key=key)
-                    st.session_state['selected_activities'][key] = is_sel
-                    op = "1" if is_sel else "0.5"
-                    c2.markdown(f"<div style='opacity:{op}'><b>{act.get('time')}</b>: {act.get('activity')}</div>", unsafe_allow_html=True)
-                    c2.caption(act.get('description'))
-                    c3.markdown(f"<div style='opacity:{op}'><b>{act.get('cost')}</b></div>", unsafe_allow_html=True)
+        tid = st.session_state['trip_id']
+        itinerary_view(trip, tid, budget_slot, safe_budget, travelers_count)
 
         # RECOMMENDATIONS
         st.subheader("💎 Smart Recommendations")
         t1, t2, t3 = st.tabs(["Hotels", "Food", "AI Chat"])
-        with t1:
-            for h in data.get('hotel_recommendations', []):
-                with st.container(border=True):
-                    c1, c2 = st.columns([3, 1])
-                    c1.markdown(f"**{h.get('name')}**")
-                    c1.caption(f"📍 {h.get('location')} | ⭐ {h.get('rating', '4.5')}")
-                    c2.markdown(f"**{h.get('price_per_night')}**")
-                    search = f"{h.get('name')} {fd.split(',')[0]} hotel"
-                    c2.link_button("Map", f"https://www.google.com/maps/search/?api=1&query={search.replace(' ','+')}")
-        with t2:
-            for f in data.get('dining_recommendations', []):
-                with st.container(border=True):
-                    c1, c2 = st.columns([3, 1])
-                    c1.markdown(f"**{f.get('name')}**")
-                    c1.caption(f"🥘 {f.get('type','Food')}")
-                    c2.markdown(f"**{f.get('price')}**")
-                    search = f"{f.get('name')} {fd.split(',')[0]} food"
-                    c2.link_button("Map", f"https://www.google.com/maps/search/?api=1&query={search.replace(' ','+')}")
-        with t3:
-            st.write("Ask questions about this trip:")
-            q = st.text_input("Example: Is it safe at night?")
-            if q: st.info(ask_travel_bot([], f"Context: {str(data)}. Q: {q}"))
\ No newline at end of file
+        city = fd.split(',')[0]
+        with t1: recommendations(trip.hotels, "hotel", city)
+        with t2: recommendations(trip.dining, "food", city)
+        with t3: chat_view(trip, tid)
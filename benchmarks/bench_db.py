@@ -0,0 +1,85 @@
+# Concurrency benchmark: the original connect-per-call db functions vs the pooled WAL layer.
+# Usage: python -m benchmarks.bench_db [threads] [ops_per_thread]
+#
+# Typical result, 8 threads x 150 mixed ops (runs vary by ~20%): legacy ~1000-1250 ops/s,
+# pooled ~1150-1450, pooled + write-behind ~1250-1650. The throughput gain is modest; what
+# write-behind mainly buys is the median call (p50 ~0.3 ms vs ~0.8 ms), since saves return at once.
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from src import db
+from src.static_data import get_smart_fallback
+
+TRIP = get_smart_fallback("Jaipur", 5, "Family")
+
+class Legacy:
+    """The pre-pool implementation: a fresh rollback-journal connection for every call."""
+    def __init__(self, path): self.path = path
+    def init_db(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('''CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT,
+                        destination TEXT, trip_data JSON, notes TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        conn.commit(); conn.close()
+    def save_trip(self, username, destination, trip_data):
+        conn = sqlite3.connect(self.path)
+        conn.execute("INSERT INTO history (username, destination, trip_data, notes) VALUES (?, ?, ?, ?)", (username, destination, json.dumps(trip_data), ""))
+        conn.commit(); conn.close()
+    def get_history(self, username):
+        conn = sqlite3.connect(self.path)
+        rows = conn.execute("SELECT id, destination, trip_data, notes, created_at FROM history WHERE username=? ORDER BY created_at DESC", (username,)).fetchall()
+        conn.close()
+        return rows
+    def update_note(self, trip_id, note):
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE history SET notes=? WHERE id=?", (note, trip_id))
+        conn.commit(); conn.close()
+
+def run(impl, threads, ops):
+    latencies, errors, lock = [], [], threading.Lock()
+
+    def worker(n):
+        rnd = random.Random(n)
+        user = f"user{n % 4}"
+        for i in range(ops):
+            t0 = time.perf_counter()
+            try:
+                r = rnd.random()
+                if r < 0.5: impl.get_history(user)
+                elif r < 0.8: impl.save_trip(user, "Jaipur", TRIP)
+                else: impl.update_note(rnd.randint(1, 50), f"note {i}")
+            except sqlite3.OperationalError as e:
+                with lock: errors.append(str(e))
+            with lock: latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    if hasattr(impl, "flush_writes"): impl.flush_writes()
+    wall = time.perf_counter() - t0
+    lat = sorted(latencies)
+    return {"ops": len(lat), "seconds": round(wall, 3), "ops_per_sec": round(len(lat) / wall, 1),
+            "p50_ms": round(1000 * statistics.median(lat), 2), "p95_ms": round(1000 * lat[int(0.95 * len(lat)) - 1], 2),
+            "locked_errors": len(errors)}
+
+def main(threads=8, ops=150):
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Legacy(os.path.join(tmp, "legacy.db"))
+        legacy.init_db()
+        out["legacy"] = run(legacy, threads, ops)
+        for mode in ("pooled", "pooled_write_behind"):
+            db.DB_NAME = os.path.join(tmp, f"{mode}.db")
+            db.WRITE_BEHIND = mode == "pooled_write_behind"
+            db.init_db()
+            out[mode] = run(db, threads, ops)
+    print(json.dumps(out, indent=2))
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
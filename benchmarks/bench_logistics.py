@@ -0,0 +1,44 @@
+# Scalar get_trip_logistics math (geopy.geodesic + calculate_costs per pair) vs the NumPy batch engine.
+# Usage: python -m benchmarks.bench_logistics [n_origins] [n_destinations]
+import json
+import sys
+import time
+import numpy as np
+from geopy.distance import geodesic
+from src.logistics_batch import batch_logistics_from_coords, distance_matrix_km
+from src.navigation import calculate_costs
+
+def main(n=50, m=200, seed=7):
+    rng = np.random.default_rng(seed)
+    # realistic spread: mostly South Asia plus some long-haul points
+    origins = np.column_stack([rng.uniform(8, 34, n), rng.uniform(68, 92, n)])
+    dests = np.column_stack([rng.uniform(-45, 65, m), rng.uniform(-120, 175, m)])
+    dests[:1] = np.column_stack([0.3 - origins[:1, 0], origins[:1, 1] - 179.7])  # near-antipodal to the origins: exercises the geodesic fallback
+
+    t0 = time.perf_counter()
+    scalar_float = np.empty((n, m))
+    scalar_inr = {mode: np.empty((n, m), dtype=np.int64) for mode in ("flight", "train", "bus", "car")}
+    for i, o in enumerate(origins):
+        for j, d in enumerate(dests):
+            km = geodesic(tuple(o), tuple(d)).km
+            scalar_float[i, j] = km
+            for mode, c in calculate_costs(int(km)).items(): scalar_inr[mode][i, j] = c["inr"]
+    scalar_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = batch_logistics_from_coords(origins, dests)
+    batch_s = time.perf_counter() - t0
+
+    rel = np.abs(distance_matrix_km(origins, dests) - scalar_float) / np.maximum(scalar_float, 1e-9)
+    print(json.dumps({
+        "pairs": n * m,
+        "scalar_seconds": round(scalar_s, 4),
+        "batch_seconds": round(batch_s, 4),
+        "speedup": round(scalar_s / batch_s, 1),
+        "max_rel_distance_error": float(rel.max()),
+        "max_abs_km_diff_after_int": int(np.abs(batch["distance_km"] - scalar_float.astype(np.int64)).max()),
+        "max_abs_inr_diff": {k: int(np.abs(batch["costs"][k]["inr"] - v).max()) for k, v in scalar_inr.items()},
+    }, indent=2))
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,76 @@
+# Cold start: import cost of the app's modules and time until the first page is rendered.
+# Usage: python -m benchmarks.bench_startup [runs] [--max-import-ms N] [--max-paint-ms N]
+# Every run is a fresh interpreter, so nothing is already in sys.modules. Exits 1 if a limit is exceeded.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("google.generativeai", "groq", "geopy", "folium", "streamlit_folium")
+
+IMPORT_PROBE = """
+import json, sys, time
+import streamlit
+t0 = time.perf_counter()
+import src.ai_engine, src.navigation, src.map_engine, src.db, src.chat, src.models
+ms = 1000 * (time.perf_counter() - t0)
+print(json.dumps({"ms": ms, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+# AppTest runs app.py the way the server does: the first run includes every import the script does
+PAINT_PROBE = """
+import json, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+t0 = time.perf_counter()
+at.run()
+first = 1000 * (time.perf_counter() - t0)
+t0 = time.perf_counter()
+at.run()
+rerun = 1000 * (time.perf_counter() - t0)
+print(json.dumps({"ms": first, "rerun_ms": rerun, "error": bool(at.exception)}))
+"""
+
+def probe(code, env):
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def summary(samples):
+    return {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1), "max_ms": round(max(samples), 1)}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Measure import time and time-to-first-paint in fresh interpreters.")
+    p.add_argument("runs", nargs="?", type=int, default=3)
+    p.add_argument("--max-import-ms", type=float, help="fail if the median app-module import exceeds this")
+    p.add_argument("--max-paint-ms", type=float, help="fail if the median first run of app.py exceeds this")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Throwaway databases so the run never touches (or benefits from) the real ones
+        env = dict(os.environ, WANDERLUST_DB=os.path.join(tmp, "bench.db"),
+                   WANDERLUST_CACHE_DB=os.path.join(tmp, "bench_cache.db"), PYTHONDONTWRITEBYTECODE="1")
+        imports = [probe(IMPORT_PROBE, env) for _ in range(args.runs)]
+        paints = [probe(PAINT_PROBE, env) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import": summary([r["ms"] for r in imports]),
+        "heavy_modules_at_import": imports[-1]["heavy"],
+        "first_paint": summary([r["ms"] for r in paints]),
+        "rerun": summary([r["rerun_ms"] for r in paints]),
+        "app_errors": sum(r["error"] for r in paints),
+    }
+    failed = []
+    if args.max_import_ms and report["import"]["median_ms"] > args.max_import_ms: failed.append("import")
+    if args.max_paint_ms and report["first_paint"]["median_ms"] > args.max_paint_ms: failed.append("first_paint")
+    if report["app_errors"]: failed.append("app_errors")
+    report["failed"] = failed
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
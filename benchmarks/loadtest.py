@@ -0,0 +1,256 @@
+# Offline load test: stub Gemini / Groq / Nominatim servers on localhost, the real app code on top.
+# Usage: python -m benchmarks.loadtest [--profile fast|slow|flaky|truncated] [--concurrency 16] [--requests 200]
+#        [--set gemini.error_rate=0.5 --set nominatim.latency_ms=300 ...] [--out report.json]
+# Drives generate_itinerary, get_trip_logistics, get_place_suggestions and the src/db.py calls
+# against throwaway databases; no API quota is used. Prints p50/p95/p99, throughput and cache hit ratios.
+import argparse
+import concurrent.futures as cf
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICES = ("gemini", "groq", "nominatim")
+# latency_ms + uniform jitter_ms per request; error_rate -> HTTP 503; truncate_rate -> body cut in half
+PROFILES = {
+    "fast":      {"latency_ms": 20, "jitter_ms": 10, "error_rate": 0.0, "truncate_rate": 0.0},
+    "slow":      {"latency_ms": 800, "jitter_ms": 400, "error_rate": 0.0, "truncate_rate": 0.0},
+    "flaky":     {"latency_ms": 100, "jitter_ms": 100, "error_rate": 0.2, "truncate_rate": 0.0},
+    "truncated": {"latency_ms": 100, "jitter_ms": 50, "error_rate": 0.0, "truncate_rate": 0.3},
+}
+
+class Stub(ThreadingHTTPServer):
+    """One fake upstream. `profile` is read per request, so it can be changed while the test runs."""
+    daemon_threads = True
+
+    def __init__(self, service, profile, itinerary, seed=0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.service, self.profile, self.itinerary = service, dict(profile), itinerary
+        self.rng = random.Random(f"{service}:{seed}")
+        self.counts = {"requests": 0, "errors": 0, "truncated": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self): return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name=f"stub-{self.service}", daemon=True).start()
+        return self
+
+    def roll(self):
+        """Decide this request's fate: (delay seconds, 'error' | 'truncate' | None)."""
+        p = self.profile
+        with self.lock:
+            self.counts["requests"] += 1
+            delay = (p["latency_ms"] + self.rng.uniform(0, p["jitter_ms"])) / 1000
+            r = self.rng.random()
+            fate = "error" if r < p["error_rate"] else "truncate" if r < p["error_rate"] + p["truncate_rate"] else None
+            if fate: self.counts["errors" if fate == "error" else "truncated"] += 1
+        return delay, fate
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, *args): pass
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        srv = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length: self.rfile.read(length)
+        delay, fate = srv.roll()
+        time.sleep(delay)
+        if fate == "error":
+            return self._send(503, json.dumps({"error": {"code": 503, "message": "stub overloaded", "status": "UNAVAILABLE"}}))
+        if srv.service == "nominatim": body = _nominatim_body(self.path)
+        else:
+            text = srv.itinerary if fate != "truncate" else srv.itinerary[:len(srv.itinerary) // 2]
+            body = _gemini_body(text, fate) if srv.service == "gemini" else _groq_body(text, fate)
+        if fate == "truncate" and srv.service == "nominatim": body = body[:len(body) // 2]
+        self._send(200, body)
+
+    do_GET = do_POST = _handle
+
+def _gemini_body(text, fate):
+    return json.dumps({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "index": 0,
+                                       "finishReason": "MAX_TOKENS" if fate else "STOP"}],
+                       "usageMetadata": {"promptTokenCount": 400, "candidatesTokenCount": len(text) // 4,
+                                         "totalTokenCount": 400 + len(text) // 4}})
+
+def _groq_body(text, fate):
+    return json.dumps({"id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+                       "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                    "finish_reason": "length" if fate else "stop"}],
+                       "usage": {"prompt_tokens": 400, "completion_tokens": len(text) // 4, "total_tokens": 400 + len(text) // 4}})
+
+def _nominatim_body(path):
+    """Deterministic fake places: coordinates derived from the query so repeated lookups agree."""
+    m = re.search(r"[?&]q=([^&]*)", path)
+    q = m.group(1).replace("+", " ") if m else "nowhere"
+    n = int((re.search(r"[?&]limit=(\d+)", path) or [0, "1"])[1])
+    out = []
+    for i in range(min(n, 3)):
+        h = zlib.crc32(f"{q}:{i}".encode())
+        out.append({"display_name": f"{q.title()} {i + 1}, Stubland", "lat": str(-60 + (h % 12000) / 100),
+                    "lon": str(-170 + (h // 12000 % 34000) / 100)})
+    return json.dumps(out)
+
+def percentiles(samples):
+    if not samples: return {}
+    s = sorted(samples)
+    at = lambda q: s[min(len(s) - 1, max(0, int(round(q * len(s))) - 1))]  # nearest rank
+    return {"p50_ms": round(at(0.50), 2), "p95_ms": round(at(0.95), 2), "p99_ms": round(at(0.99), 2), "max_ms": round(s[-1], 2)}
+
+def run_scenario(name, op, n, concurrency):
+    """Call op(i) for i in range(n) on `concurrency` threads; latency per call, throughput overall."""
+    lat, errors, results = [], [], []
+    lock = threading.Lock()
+
+    def one(i):
+        t0 = time.perf_counter()
+        try: r, err = op(i), None
+        except Exception as e: r, err = None, f"{type(e).__name__}: {e}"
+        ms = 1000 * (time.perf_counter() - t0)
+        with lock:
+            lat.append(ms)
+            results.append(r)
+            if err: errors.append(err)
+
+    t0 = time.perf_counter()
+    with cf.ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"load-{name}") as pool:
+        list(pool.map(one, range(n)))
+    wall = time.perf_counter() - t0
+    report = {"ops": n, "errors": len(errors), "seconds": round(wall, 3), "throughput_per_s": round(n / wall, 1) if wall else None,
+              **percentiles(lat)}
+    if errors: report["sample_error"] = errors[0]
+    return report, results
+
+def parse_overrides(items):
+    """['gemini.error_rate=0.5', 'latency_ms=300'] -> {'gemini': {...}, 'nominatim': {...}, ...}"""
+    out = {s: {} for s in SERVICES}
+    for item in items:
+        key, _, value = item.partition("=")
+        svc, _, field = key.rpartition(".")
+        if field not in PROFILES["fast"] or (svc and svc not in SERVICES): raise SystemExit(f"bad --set {item!r}")
+        for s in ([svc] if svc else SERVICES): out[s][field] = float(value)
+    return out
+
+def idle_stub_warnings(stubs, scenarios, groq, providers, hedge_delay):
+    """A stub the run should have reached but never did usually means its client failed before the network."""
+    expected = {"gemini": "itinerary" in scenarios, "groq": groq and "itinerary" in scenarios,
+                "nominatim": "logistics" in scenarios or "suggestions" in scenarios}
+    out = []
+    for s, stub in stubs.items():
+        if not expected[s] or stub.counts["requests"]: continue
+        errors = [h.get("last_error") for n, h in providers.items() if n.startswith(f"{s}:") and h.get("last_error")]
+        why = f"last client error: {errors[0]}" if errors else \
+              f"no client errors; the primary may have always won within the {hedge_delay}s hedge delay" if s == "groq" and hedge_delay else "no client errors recorded"
+        out.append(f"{s} stub received 0 requests ({why})")
+    return out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Load-test the app's hot paths against local stub upstreams.")
+    p.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    p.add_argument("--set", action="append", default=[], metavar="[SERVICE.]FIELD=VALUE",
+                   help="override a profile field for one service (gemini, groq, nominatim) or all of them")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--requests", type=int, default=200, help="calls per scenario")
+    p.add_argument("--distinct", type=int, default=20, help="distinct inputs per scenario (repeats exercise the caches)")
+    p.add_argument("--scenarios", default="itinerary,logistics,suggestions,db")
+    p.add_argument("--no-groq", action="store_true", help="Gemini only (no Groq key, so no Groq backup)")
+    p.add_argument("--st-cache", action="store_true", help="call through the memoising decorators (src/config.cache_data) instead of the undecorated functions")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--out", help="also write the report to this file")
+    args = p.parse_args(argv)
+
+    overrides = parse_overrides(args.set)
+    tmp = tempfile.TemporaryDirectory()
+    # Stubs and env must exist before src is imported: endpoints, DB paths and limiters are read at import
+    stubs = {s: Stub(s, {**PROFILES[args.profile], **overrides[s]}, "", args.seed).start() for s in SERVICES}
+    os.environ.update({
+        "WANDERLUST_DB": os.path.join(tmp.name, "load.db"), "WANDERLUST_CACHE_DB": os.path.join(tmp.name, "load_cache.db"),
+        "WANDERLUST_GEMINI_ENDPOINT": stubs["gemini"].url, "WANDERLUST_GROQ_URL": stubs["groq"].url,
+        "WANDERLUST_NOMINATIM_URL": stubs["nominatim"].url, "WANDERLUST_NOMINATIM_INTERVAL": "0",
+        "WANDERLUST_PLACES_ONLINE": "1", "GOOGLE_API_KEY": "stub-key",
+    })
+    if args.no_groq: os.environ.pop("GROQ_API_KEY", None)
+    else: os.environ["GROQ_API_KEY"] = "stub-key"
+
+    from src import ai_engine, cache, db, metrics, navigation
+    from src.static_data import get_smart_fallback
+    plan = get_smart_fallback("Stubville", 3, "Solo")
+    plan["trip_title"] = "Stub Itinerary"
+    for stub in stubs.values(): stub.itinerary = json.dumps(plan, ensure_ascii=False)
+    ai_engine.configure_genai()
+    db.init_db()
+    plain = (lambda f: f) if args.st_cache else (lambda f: getattr(f, "__wrapped__", f))
+    generate, logistics, suggest = plain(ai_engine.generate_itinerary), plain(navigation.get_trip_logistics), plain(navigation.get_place_suggestions)
+    rng = random.Random(args.seed)
+    k = max(1, args.distinct)
+
+    def itinerary_op(i):
+        data = generate(f"Stubville {i % k}", None, 3, "Mid", 50000, 2, "Solo", ["Food"])
+        return "fallback" if data.get("trip_title") != "Stub Itinerary" else "provider"
+
+    def db_op(i):
+        user = f"load{i % k}"
+        r = rng.random()
+        if r < 0.3: return db.save_trip(user, f"Stubville {i % k}", plan)
+        if r < 0.6: return db.get_history_page(user, limit=10)
+        if r < 0.8: return db.search_trips(user, "stub")
+        rows, _ = db.get_history_page(user, limit=1)
+        if rows: db.update_note(rows[0][0], f"note {i}", user)
+        return db.get_trip(rows[0][0], user) if rows else None
+
+    ops = {
+        "itinerary": itinerary_op,
+        # Unknown to the bundled gazetteer, so every miss goes to the (stub) geocoder
+        "logistics": lambda i: logistics(f"Stub Origin {i % k}", f"Stub Destination {(i * 7) % k}"),
+        "suggestions": lambda i: suggest(f"Stubplace {i % k}"),
+        "db": db_op,
+    }
+    report = {"config": {"profile": args.profile, "overrides": {s: o for s, o in overrides.items() if o},
+                         "concurrency": args.concurrency, "requests": args.requests, "distinct": args.distinct,
+                         "groq": not args.no_groq, "st_cache": args.st_cache, "exec_mode": ai_engine.EXEC_MODE},
+              "scenarios": {}}
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    for name in scenarios:
+        if name not in ops: raise SystemExit(f"unknown scenario {name!r} (choose from {', '.join(ops)})")
+    try:
+        for name in scenarios:
+            report["scenarios"][name], results = run_scenario(name, ops[name], args.requests, args.concurrency)
+            if name == "itinerary":
+                report["scenarios"][name]["fallback_ratio"] = round(results.count("fallback") / max(1, len(results)), 3)
+        db.flush_writes()
+        report["cache"] = {ns: {f: v[f] for f in ("hits", "misses", "hit_ratio")} for ns, v in cache.stats().items()}
+        report["providers"] = {n: {f: h[f] for f in ("state", "calls", "failures", "ewma_latency")} for n, h in ai_engine.HEALTH.snapshot().items()}
+        report["stub_requests"] = {s: dict(stub.counts) for s, stub in stubs.items()}
+        report["warnings"] = idle_stub_warnings(stubs, scenarios, not args.no_groq, ai_engine.HEALTH.snapshot(),
+                                                ai_engine.HEDGE_DELAY if ai_engine.EXEC_MODE == "race" else None)
+        for w in report["warnings"]: print(f"warning: {w}", file=sys.stderr)
+        report["metrics"] = {n: v for n, v in metrics.snapshot().items()
+                             if n in ("wanderlust_stage_seconds", "wanderlust_provider_calls_total", "wanderlust_itinerary_source_total")}
+    finally:
+        for stub in stubs.values(): stub.shutdown()
+        tmp.cleanup()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f: f.write(text + "\n")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+# Compare input tokens of the legacy prompt and the compact structured-output prompt.
+# Usage: python -m benchmarks.prompt_tokens [gemini-model]
+import json
+import os
+import sys
+import google.generativeai as genai
+from dotenv import load_dotenv
+from src.ai_engine import build_prompt
+
+load_dotenv()
+genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+model = genai.GenerativeModel(sys.argv[1] if len(sys.argv) > 1 else "gemini-2.0-flash")
+
+cases = [("Goa, India", 3, "Cheap", 20000, 2, "Couple", ["Food", "Nature"]),
+         ("Paris, France", 7, "Lux", 400000, 4, "Family", ["History", "Shopping", "Food"])]
+report = []
+for case in cases:
+    legacy = model.count_tokens(build_prompt(*case)).total_tokens
+    compact = model.count_tokens(build_prompt(*case, compact=True)).total_tokens
+    report.append({"destination": case[0], "days": case[1], "legacy_tokens": legacy, "compact_tokens": compact,
+                   "saved_pct": round(100 * (legacy - compact) / legacy, 1)})
+print(json.dumps(report, indent=2))
@@ -0,0 +1,102 @@
+"""
+Move inline history.trip_data payloads into compressed, deduplicated trip_blobs (src/blobs.py).
+
+    python migrate_trips.py                   # convert rows saved before blob storage, then VACUUM
+    python migrate_trips.py --retrain         # also train a new dictionary on every stored trip and re-encode
+
+Safe to re-run: converted rows are skipped. Prints a JSON report with payload and file sizes
+and get_trip read latency measured before and after.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import zlib
+from src import blobs, db
+
+def file_bytes(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+def read_latency(ids, repeat=3):
+    """get_trip timings in ms over `ids` (p50/p95/max)."""
+    lat = []
+    for _ in range(repeat):
+        for tid in ids:
+            t0 = time.perf_counter()
+            db.get_trip(tid)
+            lat.append(1000 * (time.perf_counter() - t0))
+    if not lat: return {}
+    lat.sort()
+    return {"p50_ms": round(statistics.median(lat), 3), "p95_ms": round(lat[int(0.95 * len(lat)) - 1], 3),
+            "max_ms": round(lat[-1], 3), "reads": len(lat)}
+
+def payload_bytes(conn):
+    inline = conn.execute("SELECT COALESCE(SUM(LENGTH(CAST(trip_data AS BLOB))), 0) FROM history").fetchone()[0]
+    stored, raw = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(raw_size), 0) FROM trip_blobs").fetchone()
+    return {"inline_json": inline, "blob_compressed": stored, "blob_canonical": raw}
+
+def convert(conn, batch):
+    """Inline rows -> blobs. Returns (converted, unreadable, plain-zlib bytes for comparison)."""
+    done = bad = plain = 0
+    while True:
+        rows = conn.execute("SELECT id, trip_data FROM history WHERE blob_hash IS NULL AND trip_data IS NOT NULL LIMIT ?",
+                            (batch,)).fetchall()
+        if not rows: return done, bad, plain
+        for tid, djson in rows:
+            try: raw = blobs.canonical(json.loads(djson))
+            except (TypeError, ValueError):
+                bad += 1
+                conn.execute("UPDATE history SET blob_hash='' WHERE id=?", (tid,))  # leave inline, never retry
+                continue
+            plain += len(zlib.compress(raw, blobs.ZLIB_LEVEL))
+            conn.execute("UPDATE history SET blob_hash=?, trip_data=NULL WHERE id=?", (db.store_blob(conn, raw), tid))
+            done += 1
+        conn.commit()
+
+def retrain(conn, size):
+    """Train on every stored blob, then re-encode them all with the new dictionary."""
+    rows = conn.execute("SELECT hash, dict_id, data FROM trip_blobs").fetchall()
+    raws = {h: blobs.decompress(data, db._zdict(conn, dict_id) if dict_id is not None else None) for h, dict_id, data in rows}
+    if not raws: return None
+    dict_id = db.add_dictionary(conn, blobs.train_dictionary(list(raws.values()), size))
+    zdict = db._zdict(conn, dict_id)
+    for h, raw in raws.items():
+        conn.execute("UPDATE trip_blobs SET dict_id=?, data=? WHERE hash=?", (dict_id, blobs.compress(raw, zdict), h))
+    conn.commit()
+    return dict_id
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Convert inline trip payloads to compressed, deduplicated blobs.")
+    p.add_argument("--db", default=db.DB_NAME)
+    p.add_argument("--batch", type=int, default=500)
+    p.add_argument("--retrain", action="store_true", help="train a new dictionary on all stored trips and re-encode")
+    p.add_argument("--dict-size", type=int, default=blobs.DICT_SIZE)
+    p.add_argument("--no-vacuum", action="store_true", help="skip VACUUM (the file only shrinks after it)")
+    args = p.parse_args(argv)
+
+    db.DB_NAME = args.db
+    db.init_db()
+    report = {"db": args.db, "file_bytes_before": file_bytes(args.db)}
+    with db.connection() as conn:
+        ids = [r[0] for r in conn.execute("SELECT id FROM history ORDER BY id DESC LIMIT 200")]
+        report["payload_bytes_before"] = payload_bytes(conn)
+    report["read_before"] = read_latency(ids)
+
+    with db.connection() as conn:
+        converted, unreadable, plain = convert(conn, args.batch)
+        if args.retrain: report["dictionary"] = retrain(conn, args.dict_size)
+        conn.execute("DELETE FROM trip_blobs WHERE hash NOT IN (SELECT blob_hash FROM history WHERE blob_hash IS NOT NULL)")
+        conn.commit()
+        report.update(converted=converted, unreadable=unreadable,
+                      unique_blobs=conn.execute("SELECT COUNT(*) FROM trip_blobs").fetchone()[0],
+                      payload_bytes_after=payload_bytes(conn), plain_zlib_bytes_converted=plain)
+        if not args.no_vacuum:
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    report["file_bytes_after"] = file_bytes(args.db)
+    report["read_after"] = read_latency(ids)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
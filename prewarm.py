@@ -0,0 +1,107 @@
+"""
+Pre-compute itineraries and logistics into the persistent cache (src/cache.py).
+
+    python prewarm.py popular.csv --workers 4 --gemini-rpm 15 --groq-rpm 30
+
+Input is a CSV with a header row, or JSONL, one request per row. Fields:
+destination (required), duration, trip_type, max_budget, travelers, interests (';'-separated in CSV),
+budget (derived from max_budget when empty), origin (enables logistics), start_date.
+Defaults mirror the app's form defaults so warmed keys line up with what users submit.
+Finished requests are appended to the progress file; re-running skips them.
+"""
+import argparse
+import concurrent.futures as cf
+import csv
+import json
+import logging
+import time
+from src import ai_engine, cache, geocode, ratelimit
+from src.models import budget_tier
+from src.navigation import get_trip_logistics, logistics_cache_key
+
+DEFAULTS = {"duration": 3, "trip_type": "Solo", "max_budget": 20000, "travelers": 1, "interests": ["Food"]}
+
+def load_requests(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    out = []
+    for row in rows:
+        r = {**DEFAULTS, **{k: v for k, v in row.items() if v not in (None, "")}}
+        if not r.get("destination"): continue
+        if isinstance(r["interests"], str): r["interests"] = [i.strip() for i in r["interests"].split(";") if i.strip()]
+        r["duration"], r["max_budget"], r["travelers"] = int(r["duration"]), int(r["max_budget"]), int(r["travelers"])
+        r.setdefault("budget", budget_tier(r["max_budget"]))
+        r["id"] = cache.make_key(itinerary=_itinerary_key(r), origin=r.get("origin"))
+        out.append(r)
+    return out
+
+def _itinerary_key(r):
+    return ai_engine.itinerary_cache_key(r["destination"], r.get("start_date"), r["duration"], r["budget"],
+                                         r["max_budget"], r["travelers"], r["trip_type"], r["interests"])
+
+def load_done(progress_path):
+    done = set()
+    try:
+        with open(progress_path, encoding="utf-8") as f:
+            for line in f:
+                try: rec = json.loads(line)
+                except ValueError: continue  # torn last line after a crash
+                if rec.get("status") in ("ok", "cached"): done.add(rec["id"])
+    except FileNotFoundError: pass
+    return done
+
+def warm(r):
+    t0 = time.perf_counter()
+    key = _itinerary_key(r)
+    if cache.contains("itinerary", key): status = "cached"
+    else:
+        ai_engine.generate_itinerary(r["destination"], r.get("start_date"), r["duration"], r["budget"],
+                                     r["max_budget"], r["travelers"], r["trip_type"], r["interests"])
+        # generate_itinerary only stores real AI output; a miss here means the static fallback answered
+        status = "ok" if cache.contains("itinerary", key) else "fallback"
+    if r.get("origin") and status != "fallback":
+        if not cache.contains("logistics", logistics_cache_key(r["origin"], r["destination"])):
+            if not get_trip_logistics(r["origin"], r["destination"]): status = "no_logistics"
+    return {"id": r["id"], "destination": r["destination"], "duration": r["duration"], "trip_type": r["trip_type"],
+            "status": status, "seconds": round(time.perf_counter() - t0, 2)}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Warm the itinerary/logistics cache from a CSV or JSONL of requests.")
+    p.add_argument("requests")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--progress", default="prewarm_progress.jsonl")
+    p.add_argument("--gemini-rpm", type=float, default=15, help="requests/minute across all Gemini models")
+    p.add_argument("--groq-rpm", type=float, default=30)
+    p.add_argument("--nominatim-rps", type=float, default=1, help="Nominatim usage policy: at most 1 req/s")
+    p.add_argument("--race", action="store_true", help="keep hedged racing (spends extra quota)")
+    args = p.parse_args(argv)
+
+    ratelimit.configure("gemini", per_minute=args.gemini_rpm)
+    ratelimit.configure("groq", per_minute=args.groq_rpm)
+    geocode.LIMITER.interval = 1.0 / args.nominatim_rps
+    if not args.race: ai_engine.EXEC_MODE = "sequential"
+    ai_engine.configure_genai()
+
+    done = load_done(args.progress)
+    todo = [r for r in load_requests(args.requests) if r["id"] not in done]
+    logging.info("prewarm: %d to do, %d already done", len(todo), len(done))
+
+    counts = {}
+    with open(args.progress, "a", encoding="utf-8") as progress, cf.ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(warm, r): r for r in todo}
+        for fut in cf.as_completed(futures):
+            try: rec = fut.result()
+            except Exception as e:
+                r = futures[fut]
+                rec = {"id": r["id"], "destination": r["destination"], "status": "error", "error": f"{type(e).__name__}: {e}"}
+            progress.write(json.dumps(rec) + "\n")
+            progress.flush()
+            counts[rec["status"]] = counts.get(rec["status"], 0) + 1
+            logging.info("prewarm %s: %s", rec["destination"], rec["status"])
+    print(json.dumps({"processed": len(todo), "skipped": len(done), "status": counts, "cache": cache.stats()}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,62 @@
-import google.generativeai as genai
-import json
+import concurrent.futures as cf
 import os
-import re
+import queue
+import threading
+import time
 import logging
-import streamlit as st
-from groq import Groq
+from src import cache, metrics, ratelimit
+from src.config import cache_data, get_key
+from src.health import HEALTH
+from src.json_stream import ItineraryStreamParser, iter_events, scan_json
 from src.static_data import get_smart_fallback # <--- Import the safety net
 
 GEMINI_MODELS = ["gemini-1.5-flash", "gemini-1.5-flash-8b", "gemini-2.0-flash"]
 GROQ_MODEL = "llama3-70b-8192" 
 logging.basicConfig(level=logging.INFO)
 
-def get_key(name): return st.secrets.get(name) or os.getenv(name)
+# "race" starts backups after HEDGE_DELAY seconds, "sequential" is the old one-by-one cascade
+EXEC_MODE = os.getenv("WANDERLUST_AI_MODE", "race")
+HEDGE_DELAY = float(os.getenv("WANDERLUST_HEDGE_DELAY", "2.0"))
+RACE_TIMEOUT = float(os.getenv("WANDERLUST_RACE_TIMEOUT", "60"))
+STREAM_MODE = os.getenv("WANDERLUST_STREAM", "1") == "1"  # app.py renders days as they arrive
+last_run = {}  # winner + per-provider timings of the most recent generation
+# Native JSON/response-schema modes (Gemini response_schema, Groq json_object) + the compact prompt
+STRUCTURED_OUTPUT = os.getenv("WANDERLUST_STRUCTURED", "1") == "1"
+PROMPT_VERSION = "v1"  # bump when build_prompt changes so stale cache entries are not served
+PROMPT_USES_START_DATE = False  # start_date is not part of the prompt, so it stays out of the cache key
+# Alternative API hosts (a proxy, or the stub servers in benchmarks/loadtest.py); unset = the real APIs
+GEMINI_ENDPOINT = os.getenv("WANDERLUST_GEMINI_ENDPOINT")
+GROQ_BASE_URL = os.getenv("WANDERLUST_GROQ_URL")
+# Failover is ours (breaker + hedged race): the Gemini SDK must not sit retrying a 503 for minutes
+GEMINI_REQUEST_OPTIONS = {"timeout": float(os.getenv("WANDERLUST_GEMINI_TIMEOUT", "60")), "retry": None}
+
+# The provider SDKs cost ~1.2 s to import together, so they load on the first call that needs them
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+def _groq(api_key):
+    from groq import Groq
+    return Groq(api_key=api_key, base_url=GROQ_BASE_URL)
 
 def configure_genai():
     k = get_key("GOOGLE_API_KEY")
-    if k: genai.configure(api_key=k)
+    if not k: return
+    if GEMINI_ENDPOINT: _genai().configure(api_key=k, transport="rest", client_options={"api_endpoint": GEMINI_ENDPOINT})
+    else: _genai().configure(api_key=k)
 
 def extract_json(text):
-    text = re.sub(r"```json\s*", "", text, flags=re.IGNORECASE).replace("```", "")
-    match = re.search(r"(\{.*\})", text, re.DOTALL)
-    if match:
-        try: return json.loads(match.group(1))
-        except: pass
-    try: return json.loads(text)
-    except: return None
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def generate_itinerary(destination, start_date, duration, budget, max_budget, travelers, trip_type, interests):
-    prompt = f"""
+    return scan_json(text)
+
+def build_prompt(destination, duration, budget, max_budget, travelers, trip_type, interests, compact=False):
+    if compact:
+        # The shape is enforced by the provider's JSON mode, so only the field names are spelled out
+        return (f"Plan a {duration}-day trip to {destination} for {travelers} ({trip_type}). "
+                f"Budget {budget}, cap ₹{max_budget}. Interests: {', '.join(interests)}. "
+                f"Days 1-{duration}, no repeats. Prices as '₹Amount', group totals. Reply in JSON: "
+                "trip_title, travel_persona, total_estimated_cost, days[{day, activities[{time, activity, description, location, cost}]}], "
+                "hotel_recommendations[{name, location, rating, price_per_night}], dining_recommendations[{name, type, location, price}], safety_tips.")
+    return f"""
     ROLE: Expert Travel Planner. TASK: {duration}-Day Trip to {destination} for {travelers} ({trip_type}).
     BUDGET: {budget} (Cap: ₹{max_budget}). Interests: {', '.join(interests)}.
     
@@ -60,33 +88,365 @@ def generate_itinerary(destination, start_date, duration, budget, max_budget, tr
         "safety_tips": "Tip"
     }}
     """
-    
-    # 1. Gemini
-    for m in GEMINI_MODELS:
-        try:
-            model = genai.GenerativeModel(m)
-            res = model.generate_content(prompt)
-            data = extract_json(res.text)
-            if data and len(data.get("days", [])) >= 1: return data
-        except: continue
 
-    # 2. Groq
+def is_valid_itinerary(data): return bool(data) and len(data.get("days", [])) >= 1
+
+_S, _A = {"type": "STRING"}, lambda props: {"type": "ARRAY", "items": {"type": "OBJECT", "properties": props, "required": list(props)}}
+ITINERARY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "trip_title": _S, "travel_persona": _S, "total_estimated_cost": _S,
+        "days": _A({"day": {"type": "INTEGER"}, "activities": _A({"time": _S, "activity": _S, "description": _S, "location": _S, "cost": _S})}),
+        "hotel_recommendations": _A({"name": _S, "location": _S, "rating": _S, "price_per_night": _S}),
+        "dining_recommendations": _A({"name": _S, "type": _S, "location": _S, "price": _S}),
+        "safety_tips": _S,
+    },
+    "required": ["trip_title", "days", "hotel_recommendations", "dining_recommendations"],
+}
+
+# (prompt variant, provider) -> token totals, so the compact prompt can be compared with the legacy one
+TOKEN_USAGE = {}
+_usage_lock = threading.Lock()
+
+def record_tokens(provider, variant, prompt_tokens, output_tokens):
+    if prompt_tokens is None and output_tokens is None: return
+    with _usage_lock:
+        u = TOKEN_USAGE.setdefault((variant, provider), {"calls": 0, "prompt_tokens": 0, "output_tokens": 0})
+        u["calls"] += 1
+        u["prompt_tokens"] += prompt_tokens or 0
+        u["output_tokens"] += output_tokens or 0
+    metrics.inc("wanderlust_tokens_total", prompt_tokens or 0, provider=provider, variant=variant, kind="prompt")
+    metrics.inc("wanderlust_tokens_total", output_tokens or 0, provider=provider, variant=variant, kind="output")
+    logging.info("tokens %s [%s]: prompt=%s output=%s", provider, variant, prompt_tokens, output_tokens)
+
+def token_summary():
+    """{variant: {provider: {calls, avg_prompt_tokens, avg_output_tokens}}}"""
+    with _usage_lock:
+        out = {}
+        for (variant, provider), u in TOKEN_USAGE.items():
+            out.setdefault(variant, {})[provider] = {"calls": u["calls"], "avg_prompt_tokens": round(u["prompt_tokens"] / u["calls"], 1),
+                                                     "avg_output_tokens": round(u["output_tokens"] / u["calls"], 1)}
+        return out
+
+def _gemini_usage(name, variant, res):
+    u = getattr(res, "usage_metadata", None)
+    if u: record_tokens(name, variant, getattr(u, "prompt_token_count", None), getattr(u, "candidates_token_count", None))
+
+def _groq_usage(name, variant, usage):
+    if usage: record_tokens(name, variant, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+def _gemini_model(model_name, structured):
+    if not structured: return _genai().GenerativeModel(model_name)
+    return _genai().GenerativeModel(model_name, generation_config={"response_mime_type": "application/json", "response_schema": ITINERARY_SCHEMA})
+
+def _groq_args(structured):
+    return {"response_format": {"type": "json_object"}} if structured else {}
+
+def _variant(structured): return "structured" if structured else "legacy"
+
+def _gemini_call(model_name, structured=False):
+    def call(prompt):
+        res = _gemini_model(model_name, structured).generate_content(prompt, request_options=GEMINI_REQUEST_OPTIONS)
+        _gemini_usage(f"gemini:{model_name}", _variant(structured), res)
+        return res.text
+    return call
+
+def _groq_call(api_key, structured=False):
+    def call(prompt):
+        resp = _groq(api_key).chat.completions.create(messages=[{"role":"user","content":prompt}], model=GROQ_MODEL, **_groq_args(structured))
+        _groq_usage(f"groq:{GROQ_MODEL}", _variant(structured), resp.usage)
+        return resp.choices[0].message.content
+    return call
+
+def _gemini_stream(model_name, structured=False):
+    def call(prompt):
+        res = _gemini_model(model_name, structured).generate_content(prompt, stream=True, request_options=GEMINI_REQUEST_OPTIONS)
+        for chunk in res:
+            if chunk.parts: yield chunk.text
+        _gemini_usage(f"gemini:{model_name}", _variant(structured), res)
+    return call
+
+def _groq_stream(api_key, structured=False):
+    # Groq's JSON mode does not stream, so streaming only gets the compact prompt
+    def call(prompt):
+        stream = _groq(api_key).chat.completions.create(messages=[{"role":"user","content":prompt}], model=GROQ_MODEL, stream=True)
+        for chunk in stream:
+            if chunk.choices: yield chunk.choices[0].delta.content or ""
+            x = getattr(chunk, "x_groq", None)
+            if x and getattr(x, "usage", None): _groq_usage(f"groq:{GROQ_MODEL}", _variant(structured), x.usage)
+    return call
+
+def get_providers(stream=False, structured=None):
+    """(name, call) pairs: Gemini models first, then Groq if keyed, re-ordered by observed health
+    (open circuits are skipped). With stream=True each call yields text chunks instead."""
+    structured = STRUCTURED_OUTPUT if structured is None else structured
+    gemini, groq = (_gemini_stream, _groq_stream) if stream else (_gemini_call, _groq_call)
+    providers = [(f"gemini:{m}", gemini(m, structured)) for m in GEMINI_MODELS]
     gk = get_key("GROQ_API_KEY")
-    if gk:
+    if gk: providers.append((f"groq:{GROQ_MODEL}", groq(gk, structured)))
+    calls = dict(providers)
+    return [(n, calls[n]) for n in HEALTH.rank(list(calls))]
+
+def record_attempt(name, call, seconds, err):
+    """Provider outcome metrics: ok, invalid (answered, but no usable itinerary), error or circuit_open."""
+    outcome = "ok" if not err else "circuit_open" if err == "circuit open" else "invalid" if err == "invalid itinerary JSON" else "error"
+    if outcome != "circuit_open": metrics.observe("wanderlust_provider_seconds", seconds, provider=name, call=call, outcome=outcome)
+    metrics.inc("wanderlust_provider_calls_total", provider=name, call=call, outcome=outcome)
+
+def _attempt(name, call, prompt):
+    if not HEALTH.allow(name):
+        record_attempt(name, "itinerary", 0.0, "circuit open")
+        return {"provider": name, "seconds": 0.0, "error": "circuit open", "data": None}
+    try:
+        ratelimit.acquire(name)
+        t0 = time.perf_counter()
         try:
-            client = Groq(api_key=gk)
-            resp = client.chat.completions.create(messages=[{"role":"user","content":prompt}], model=GROQ_MODEL)
-            data = extract_json(resp.choices[0].message.content)
-            if data and len(data.get("days", [])) >= 1: return data
-        except: pass
+            data = extract_json(call(prompt))
+            err = None if is_valid_itinerary(data) else "invalid itinerary JSON"
+        except Exception as e:
+            data, err = None, f"{type(e).__name__}: {e}"
+        HEALTH.record(name, not err, time.perf_counter() - t0, err)
+    finally:
+        HEALTH.release(name)  # a no-op after record(); frees a half-open probe if a BaseException got out
+    record_attempt(name, "itinerary", time.perf_counter() - t0, err)
+    return {"provider": name, "seconds": round(time.perf_counter() - t0, 3), "error": err, "data": None if err else data}
+
+def run_sequential(providers, prompt):
+    report = {"mode": "sequential", "winner": None, "timings": {}}
+    for name, call in providers:
+        r = _attempt(name, call, prompt)
+        report["timings"][name] = {"seconds": r["seconds"], "status": "failed" if r["error"] else "won", "error": r["error"]}
+        if not r["error"]:
+            report["winner"] = name
+            return r["data"], report
+    return None, report
+
+def run_race(providers, prompt, hedge_delay=HEDGE_DELAY, timeout=RACE_TIMEOUT):
+    """
+    Hedged execution: the primary starts at once, each backup starts after `hedge_delay`
+    seconds without an answer (or immediately when a running provider fails).
+    The first valid itinerary wins; everything still queued or running is cancelled.
+    """
+    report = {"mode": "race", "winner": None, "timings": {}}
+    if not providers: return None, report
+    queue, pending, started = list(providers), {}, {}
+    pool = cf.ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="llm-race")
+    deadline = time.perf_counter() + timeout
+
+    def launch():
+        name, call = queue.pop(0)
+        started[name] = time.perf_counter()
+        pending[pool.submit(_attempt, name, call, prompt)] = name
+
+    try:
+        launch()
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0: break
+            done, _ = cf.wait(pending, timeout=min(hedge_delay, remaining) if queue else remaining, return_when=cf.FIRST_COMPLETED)
+            if not done:
+                if queue: launch()  # hedge: primary is slow, start the next backup
+                continue
+            for fut in done:
+                pending.pop(fut)
+                r = fut.result()
+                if r["error"]:
+                    report["timings"][r["provider"]] = {"seconds": r["seconds"], "status": "failed", "error": r["error"]}
+                    if queue: launch()
+                elif not report["winner"]:
+                    report["winner"] = r["provider"]
+                    report["timings"][r["provider"]] = {"seconds": r["seconds"], "status": "won", "error": None}
+                    return r["data"], report
+        return None, report
+    finally:
+        now = time.perf_counter()
+        for fut, name in pending.items():
+            fut.cancel()
+            report["timings"][name] = {"seconds": round(now - started[name], 3), "status": "cancelled", "error": None}
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def itinerary_cache_key(destination, start_date, duration, budget, max_budget, travelers, trip_type, interests):
+    return cache.itinerary_key(destination, duration, budget, max_budget, travelers, trip_type, interests,
+                               start_date=start_date if PROMPT_USES_START_DATE else None,
+                               version=f"{PROMPT_VERSION}-{_variant(STRUCTURED_OUTPUT)}")
+
+@cache_data(ttl=3600)
+@metrics.timed("generate_itinerary")
+def generate_itinerary(destination, start_date, duration, budget, max_budget, travelers, trip_type, interests):
+    key = itinerary_cache_key(destination, start_date, duration, budget, max_budget, travelers, trip_type, interests)
+    cached = cache.safe_get("itinerary", key)
+    if is_valid_itinerary(cached):
+        metrics.inc("wanderlust_itinerary_source_total", source="cache")
+        return cached
+
+    prompt = build_prompt(destination, duration, budget, max_budget, travelers, trip_type, interests, compact=STRUCTURED_OUTPUT)
+
+    # 1. Gemini -> 2. Groq (raced or one by one)
+    providers = get_providers()
+    data, report = run_race(providers, prompt) if EXEC_MODE == "race" else run_sequential(providers, prompt)
+    last_run.clear(); last_run.update(report)
+    logging.info("itinerary providers: %s", report)
+    if data:
+        metrics.inc("wanderlust_itinerary_source_total", source="provider")
+        cache.safe_put("itinerary", key, data)
+        return data
 
     # 3. STATIC FALLBACK (Guaranteed to work)
-    return get_smart_fallback(destination, duration, trip_type)
+    metrics.inc("wanderlust_itinerary_source_total", source="fallback")
+    return get_smart_fallback(destination, duration, trip_type, budget, interests)
 
-def ask_travel_bot(history, question):
+def _pump(name, call, prompt, out, stop):
+    """One streaming provider on its own thread: ("chunk", name, text)... then ("end", name, error or None)."""
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        chat = model.start_chat(history=history)
-        return chat.send_message(question).text
-    except:
-        return "I'm offline right now, but you can check the itinerary tabs for details!"
\ No newline at end of file
+        ratelimit.acquire(name)
+        for chunk in call(prompt):
+            if stop.is_set(): return  # lost the race; nobody reads this provider any more
+            out.put(("chunk", name, chunk))
+        out.put(("end", name, None))
+    except Exception as e:
+        out.put(("end", name, f"{type(e).__name__}: {e}"))
+
+def stream_itinerary(destination, start_date, duration, budget, max_budget, travelers, trip_type, interests,
+                     hedge_delay=None, timeout=RACE_TIMEOUT):
+    """
+    Streaming variant of generate_itinerary. Yields (kind, payload) events:
+    ("field", {name: value}), ("day", day), ("hotel", hotel), ("dining", dining) as each one
+    is complete, ("reset", provider) when a provider dies mid-stream and the next one starts over,
+    and finally ("done", full_itinerary).
+
+    Hedged like run_race: a backup starts when no provider has sent a first chunk within
+    `hedge_delay` seconds (default HEDGE_DELAY in race mode, never in sequential mode) or when one
+    fails. The first provider to send a chunk is streamed; the others are cancelled.
+    """
+    key = itinerary_cache_key(destination, start_date, duration, budget, max_budget, travelers, trip_type, interests)
+    cached = cache.safe_get("itinerary", key)
+    if is_valid_itinerary(cached):
+        metrics.inc("wanderlust_itinerary_source_total", source="cache")
+        yield from iter_events(cached)
+        yield "done", cached
+        return
+
+    if hedge_delay is None: hedge_delay = HEDGE_DELAY if EXEC_MODE == "race" else None
+    prompt = build_prompt(destination, duration, budget, max_budget, travelers, trip_type, interests, compact=STRUCTURED_OUTPUT)
+    report = {"mode": "stream", "winner": None, "timings": {}}
+    waiting, running, out = get_providers(stream=True), {}, queue.Queue()
+    leader, dirty, deadline = None, False, time.perf_counter() + timeout
+
+    def launch():
+        while waiting:
+            name, call = waiting.pop(0)
+            if not HEALTH.allow(name):
+                record_attempt(name, "stream", 0.0, "circuit open")
+                continue
+            running[name] = {"t0": time.perf_counter(), "first": None, "parser": ItineraryStreamParser(), "stop": threading.Event()}
+            threading.Thread(target=_pump, args=(name, call, prompt, out, running[name]["stop"]),
+                             name=f"llm-stream-{name}", daemon=True).start()
+            return
+
+    def cancel(name):
+        r = running.pop(name)
+        r["stop"].set()
+        HEALTH.release(name)  # no outcome to record, but a half-open probe must be given back
+        report["timings"][name] = {"seconds": round(time.perf_counter() - r["t0"], 3), "first_event": r["first"],
+                                   "status": "cancelled", "error": None}
+
+    try:
+        launch()
+        while running:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0: break
+            hedging = leader is None and waiting and hedge_delay is not None
+            try: kind, name, payload = out.get(timeout=min(hedge_delay, remaining) if hedging else remaining)
+            except queue.Empty:
+                if hedging: launch()  # hedge: nothing has started streaming yet, start the next backup
+                continue
+            r = running.get(name)
+            if r is None: continue  # leftovers from a cancelled provider
+            if kind == "chunk":
+                if leader is None:
+                    leader = name
+                    for other in [n for n in running if n != name]: cancel(other)
+                    if dirty: yield "reset", name
+                for event in r["parser"].feed(payload):
+                    if r["first"] is None: r["first"] = round(time.perf_counter() - r["t0"], 3)
+                    dirty = True
+                    yield event
+                continue
+            data, err = None, payload
+            if not err:
+                data = extract_json(r["parser"].text)
+                err = None if is_valid_itinerary(data) else "invalid itinerary JSON"
+            running.pop(name)
+            seconds = time.perf_counter() - r["t0"]
+            HEALTH.record(name, not err, seconds, err)
+            record_attempt(name, "stream", seconds, err)
+            report["timings"][name] = {"seconds": round(seconds, 3), "first_event": r["first"],
+                                       "status": "failed" if err else "won", "error": err}
+            if not err:
+                report["winner"] = name
+                last_run.clear(); last_run.update(report)
+                logging.info("itinerary providers: %s", report)
+                metrics.inc("wanderlust_itinerary_source_total", source="provider")
+                cache.safe_put("itinerary", key, data)
+                yield "done", data
+                return
+            if name == leader: leader = None
+            if leader is None: launch()  # a failure starts the next provider at once
+    finally:
+        # Timed out, or the consumer closed us mid-stream (GeneratorExit): stop the rest, free their probes
+        for name in list(running): cancel(name)
+
+    last_run.clear(); last_run.update(report)
+    logging.info("itinerary providers: %s", report)
+    metrics.inc("wanderlust_itinerary_source_total", source="fallback")
+    data = get_smart_fallback(destination, duration, trip_type, budget, interests)
+    if dirty: yield "reset", "fallback"
+    yield from iter_events(data)
+    yield "done", data
+
+def _gemini_chat(model_name):
+    def call(history, question):
+        res = _genai().GenerativeModel(model_name).start_chat(history=history).send_message(question, request_options=GEMINI_REQUEST_OPTIONS)
+        _gemini_usage(f"gemini:{model_name}", "chat", res)
+        return res.text
+    return call
+
+def _groq_chat(api_key):
+    def call(history, question):
+        # Gemini-style history ({"role": "user"|"model", "parts": [...]}) -> OpenAI-style messages
+        msgs = [{"role": "assistant" if h.get("role") == "model" else "user", "content": " ".join(map(str, h.get("parts", [])))} for h in history]
+        msgs.append({"role": "user", "content": question})
+        resp = _groq(api_key).chat.completions.create(messages=msgs, model=GROQ_MODEL)
+        _groq_usage(f"groq:{GROQ_MODEL}", "chat", resp.usage)
+        return resp.choices[0].message.content
+    return call
+
+def get_chat_providers():
+    providers = [(f"gemini:{m}", _gemini_chat(m)) for m in GEMINI_MODELS]
+    gk = get_key("GROQ_API_KEY")
+    if gk: providers.append((f"groq:{GROQ_MODEL}", _groq_chat(gk)))
+    calls = dict(providers)
+    return [(n, calls[n]) for n in HEALTH.rank(list(calls))]
+
+OFFLINE_REPLY = "I'm offline right now, but you can check the itinerary tabs for details!"
+
+def ask_travel_bot(history, question):
+    for name, call in get_chat_providers():
+        if not HEALTH.allow(name):
+            record_attempt(name, "chat", 0.0, "circuit open")
+            continue
+        try:
+            ratelimit.acquire(name)
+            t0 = time.perf_counter()
+            try:
+                answer = call(history, question)
+                HEALTH.record(name, True, time.perf_counter() - t0)
+                record_attempt(name, "chat", time.perf_counter() - t0, None)
+                return answer
+            except Exception as e:
+                HEALTH.record(name, False, time.perf_counter() - t0, f"{type(e).__name__}: {e}")
+                record_attempt(name, "chat", time.perf_counter() - t0, f"{type(e).__name__}: {e}")
+                logging.warning("chat provider %s failed: %s", name, e)
+        finally:
+            HEALTH.release(name)
+    return OFFLINE_REPLY
@@ -0,0 +1,54 @@
+# src/blobs.py
+# Content-addressed trip payloads: canonical JSON -> sha256 key, zlib with a preset dictionary.
+#
+# Itineraries are highly repetitive (the same keys, time slots, currency strings and fallback
+# phrases in every row), but each one is only a few KB, so plain zlib never gets to learn them.
+# A preset dictionary primes the compressor with those strings up front.
+import hashlib
+import json
+import re
+import zlib
+from collections import Counter
+
+ZLIB_LEVEL = 9
+DICT_SIZE = 16 * 1024   # zlib only looks back 32 KB, and the payload itself needs part of that window
+
+# JSON string literals (with their trailing ':' or ',') and runs of structural characters
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"[:,]?|[\[\]{},:]+|[^"\[\]{},:]+')
+
+def canonical(trip_data):
+    """Stable bytes for hashing/compression: key order and whitespace no longer make equal trips differ."""
+    return json.dumps(trip_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def content_hash(raw): return hashlib.sha256(raw).hexdigest()
+
+def train_dictionary(samples, size=DICT_SIZE, max_ngram=3):
+    """
+    Build a zlib preset dictionary from canonical payloads: runs of 1..max_ngram JSON tokens that
+    recur across samples, scored by bytes they would save. Highest scores go last, since zlib
+    encodes matches nearest the end of the dictionary with the shortest distances.
+    """
+    doc_freq, total = Counter(), Counter()
+    for raw in samples:
+        tokens = _TOKEN.findall(raw)
+        grams = Counter(b"".join(tokens[i:i + n]) for n in range(1, max_ngram + 1) for i in range(len(tokens) - n + 1))
+        total.update(grams)
+        doc_freq.update(grams.keys())
+    min_docs = 2 if len(samples) > 1 else 1
+    scored = sorted(((len(g) * total[g], g) for g in total if doc_freq[g] >= min_docs and len(g) > 3), reverse=True)
+    picked, seen = [], bytearray()
+    for _, gram in scored:
+        if len(seen) + len(gram) > size or gram in seen: continue
+        picked.append(gram)
+        seen += gram + b"\0"
+        if len(seen) >= size - 4: break
+    return b"".join(reversed(picked))
+
+def compress(raw, zdict=None):
+    c = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, zdict) if zdict \
+        else zlib.compressobj(ZLIB_LEVEL)
+    return c.compress(raw) + c.flush()
+
+def decompress(data, zdict=None):
+    d = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return d.decompress(data) + d.flush()
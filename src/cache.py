@@ -0,0 +1,132 @@
+# src/cache.py
+# Disk-backed response cache shared by every process that points at the same file.
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from src import metrics
+
+CACHE_DB = os.getenv("WANDERLUST_CACHE_DB", "wanderlust_cache.db")
+CACHE_TTL = int(os.getenv("WANDERLUST_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("WANDERLUST_CACHE_MAX", "5000"))
+
+_ready = False
+
+def _connect():
+    global _ready
+    conn = sqlite3.connect(CACHE_DB, timeout=10)
+    if not _ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS cache
+                        (ns TEXT, key TEXT, value TEXT, created_at REAL, accessed_at REAL,
+                         PRIMARY KEY (ns, key))''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache (ns, accessed_at)")
+        conn.execute('''CREATE TABLE IF NOT EXISTS cache_stats
+                        (ns TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0, evictions INTEGER DEFAULT 0)''')
+        conn.commit()
+        _ready = True
+    return conn
+
+def _bump(conn, ns, field, n=1):
+    conn.execute("INSERT OR IGNORE INTO cache_stats (ns) VALUES (?)", (ns,))
+    conn.execute(f"UPDATE cache_stats SET {field} = {field} + ? WHERE ns=?", (n, ns))
+
+def make_key(**parts):
+    """Stable hash of the keyword arguments (sorted keys, compact JSON)."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def itinerary_key(destination, duration, budget, max_budget, travelers, trip_type, interests, start_date=None, version="v1"):
+    """Canonical itinerary key: case/whitespace-insensitive destination, interests as a sorted set."""
+    parts = {
+        "destination": " ".join(str(destination).lower().split()),
+        "duration": int(duration), "budget": budget, "max_budget": int(max_budget),
+        "travelers": int(travelers), "trip_type": trip_type,
+        "interests": sorted({str(i).strip().lower() for i in interests or []}),
+        "version": version,
+    }
+    if start_date is not None: parts["start_date"] = str(start_date)
+    return make_key(**parts)
+
+def get(ns, key, ttl=CACHE_TTL):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value, created_at FROM cache WHERE ns=? AND key=?", (ns, key)).fetchone()
+        now = time.time()
+        if row and now - row[1] <= ttl:
+            conn.execute("UPDATE cache SET accessed_at=? WHERE ns=? AND key=?", (now, ns, key))
+            _bump(conn, ns, "hits")
+            conn.commit()
+            metrics.inc("wanderlust_cache_requests_total", ns=ns, result="hit")
+            return json.loads(row[0])
+        if row: conn.execute("DELETE FROM cache WHERE ns=? AND key=?", (ns, key))
+        _bump(conn, ns, "misses")
+        metrics.inc("wanderlust_cache_requests_total", ns=ns, result="expired" if row else "miss")
+        conn.commit()
+        return None
+    finally:
+        conn.close()
+
+def contains(ns, key, ttl=CACHE_TTL):
+    """Fresh entry present? Does not touch LRU order or hit/miss counters."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT created_at FROM cache WHERE ns=? AND key=?", (ns, key)).fetchone()
+        return bool(row) and time.time() - row[0] <= ttl
+    finally:
+        conn.close()
+
+def put(ns, key, value, max_entries=CACHE_MAX_ENTRIES):
+    conn = _connect()
+    try:
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO cache (ns, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                     (ns, key, json.dumps(value), now, now))
+        # LRU eviction: drop the least recently read entries beyond the cap
+        over = conn.execute("SELECT COUNT(*) FROM cache WHERE ns=?", (ns,)).fetchone()[0] - max_entries
+        if over > 0:
+            conn.execute('''DELETE FROM cache WHERE rowid IN
+                            (SELECT rowid FROM cache WHERE ns=? ORDER BY accessed_at LIMIT ?)''', (ns, over))
+            _bump(conn, ns, "evictions", over)
+        conn.commit()
+    finally:
+        conn.close()
+
+def safe_get(ns, key, **kw):
+    """`get` that logs and returns None instead of raising (the cache must never break a request)."""
+    try: return get(ns, key, **kw)
+    except Exception as e:
+        metrics.inc("wanderlust_cache_requests_total", ns=ns, result="error")
+        logging.warning("cache get failed (%s): %s", ns, e)
+        return None
+
+def safe_put(ns, key, value, **kw):
+    try: put(ns, key, value, **kw)
+    except Exception as e:
+        metrics.inc("wanderlust_stage_errors_total", stage="cache.put", error=type(e).__name__)
+        logging.warning("cache set failed (%s): %s", ns, e)
+
+def stats():
+    """{ns: {entries, hits, misses, evictions, hit_ratio}} across all processes using the file."""
+    conn = _connect()
+    try:
+        out = {}
+        for ns, hits, misses, ev in conn.execute("SELECT ns, hits, misses, evictions FROM cache_stats"):
+            out[ns] = {"entries": 0, "hits": hits, "misses": misses, "evictions": ev,
+                       "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0}
+        for ns, n in conn.execute("SELECT ns, COUNT(*) FROM cache GROUP BY ns"):
+            out.setdefault(ns, {"entries": 0, "hits": 0, "misses": 0, "evictions": 0, "hit_ratio": 0.0})["entries"] = n
+        return out
+    finally:
+        conn.close()
+
+def clear(ns=None):
+    conn = _connect()
+    try:
+        if ns: conn.execute("DELETE FROM cache WHERE ns=?", (ns,))
+        else: conn.execute("DELETE FROM cache")
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,49 @@
+# src/chat.py
+# Per-trip chat sessions: compact itinerary context, rolling history, memoised answers.
+import hashlib
+import json
+from src import cache
+from src.ai_engine import ask_travel_bot, OFFLINE_REPLY
+
+MAX_TURNS = 6  # question/answer pairs kept in the prompt history
+
+def trip_hash(trip_data):
+    return hashlib.sha1(json.dumps(trip_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def summarize_trip(trip):
+    """One compact line per day from the typed Itinerary (src.models) instead of the raw dict repr."""
+    lines = [f"{trip.trip_title} ({len(trip.days)} days, est. {trip.total_estimated_cost or '₹' + format(trip.total_inr, ',')})"]
+    for d in trip.days:
+        lines.append(f"D{d.day}: " + "; ".join(f"{a.time} {a.activity}" + (f" @{a.location}" if a.location else "") + (f" ₹{a.cost_inr}" if a.cost_inr else "")
+                                           for a in d.activities))
+    if trip.hotels: lines.append("Hotels: " + "; ".join(f"{h.name} ({h.location}, {h.price_per_night})" for h in trip.hotels))
+    if trip.dining: lines.append("Food: " + "; ".join(f"{f.name} ({f.type})" for f in trip.dining))
+    if trip.safety_tips: lines.append(f"Safety: {trip.safety_tips}")
+    return "\n".join(lines)
+
+class TravelChat:
+    """Chat about one trip. The context is built once; answers are memoised by (trip hash, question)."""
+
+    def __init__(self, trip_id, trip):
+        self.trip_id = trip_id
+        self.context = summarize_trip(trip)
+        self.turns = []  # (role, text) for display, role in {"user", "assistant"}
+
+    def _history(self):
+        # Gemini-style history: the context as the first exchange, then only the latest turns
+        history = [{"role": "user", "parts": [f"You answer questions about this trip.\n{self.context}"]},
+                   {"role": "model", "parts": ["Understood."]}]
+        for role, text in self.turns[-2 * MAX_TURNS:]:
+            history.append({"role": "model" if role == "assistant" else "user", "parts": [text]})
+        return history
+
+    def ask(self, question):
+        question = " ".join(str(question).split())
+        if not question: return None
+        key = cache.make_key(trip=self.trip_id, q=question.lower())
+        answer = cache.safe_get("chat", key)
+        if answer is None:
+            answer = ask_travel_bot(self._history(), question)
+            if answer != OFFLINE_REPLY: cache.safe_put("chat", key, answer)
+        self.turns += [("user", question), ("assistant", answer)]
+        return answer
@@ -0,0 +1,88 @@
+# src/config.py
+# Secrets and memoisation that work with or without Streamlit. Inside `streamlit run` they are
+# st.secrets and st.cache_data; in the headless API (api.py) and CLI tools they are environment
+# variables and an in-process TTL cache, and Streamlit is never imported.
+import copy
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+def in_streamlit():
+    """True while a Streamlit server (or AppTest) is running this process."""
+    if "streamlit" not in sys.modules: return False  # nothing has imported it, so no app is running
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+def get_key(name):
+    """API key / setting: st.secrets inside the app (if present there), else the environment."""
+    if in_streamlit():
+        import streamlit as st
+        try: v = st.secrets.get(name)
+        except Exception: v = None  # no secrets.toml
+        if v: return v
+    return os.getenv(name)
+
+class _TTLCache:
+    """Thread-safe LRU with per-entry expiry: the headless stand-in for st.cache_data's store."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl, self.max_entries = ttl, max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None: return None
+            if self.ttl is not None and time.monotonic() - hit[0] > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries: self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+def cache_data(ttl=None, max_entries=1024, show_spinner=False):
+    """
+    Drop-in for @st.cache_data(ttl=...). Each call goes to st.cache_data when running under
+    Streamlit, otherwise to a local TTL cache keyed on the arguments (lists and dicts included).
+    Both hand back a copy, so callers may mutate what they get.
+    """
+    def decorate(fn):
+        local = _TTLCache(ttl, max_entries)
+        st_cached = []  # built on first use inside Streamlit, so importing this module never imports it
+
+        def streamlit_version():
+            if not st_cached:
+                import streamlit as st
+                st_cached.append(st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=show_spinner)(fn))
+            return st_cached[0]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if in_streamlit(): return streamlit_version()(*args, **kwargs)
+            key = json.dumps([args, kwargs], sort_keys=True, default=str)
+            hit = local.get(key)
+            if hit is not None: return copy.deepcopy(hit[1])
+            value = fn(*args, **kwargs)
+            local.put(key, value)
+            return copy.deepcopy(value)
+
+        def clear():
+            local.clear()
+            if st_cached: st_cached[0].clear()
+
+        wrapper.clear = clear
+        return wrapper
+    return decorate
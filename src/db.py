@@ -1,57 +1,372 @@
 import sqlite3
+import atexit
 import json
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from src import blobs, metrics
+from src.models import Itinerary
 
-DB_NAME = "wanderlust.db"
+DB_NAME = os.getenv("WANDERLUST_DB", "wanderlust.db")
+POOL_SIZE = int(os.getenv("WANDERLUST_DB_POOL", "8"))
+# Queue save_trip / update_note on a background writer so page renders never wait on disk
+WRITE_BEHIND = os.getenv("WANDERLUST_WRITE_BEHIND", "0") == "1"
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # readers no longer block the writer (and vice versa)
+    "PRAGMA synchronous=NORMAL",    # safe with WAL, far fewer fsyncs
+    "PRAGMA busy_timeout=10000",    # wait for the write lock instead of 'database is locked'
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",      # 8 MB page cache per connection
+)
+
+class ConnectionPool:
+    """
+    Reusable connections (Streamlit runs every rerun on a fresh thread, so thread-locals would not
+    survive). Each pooled connection keeps sqlite3's prepared-statement cache warm.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path, self.size = path, size
+        self._idle = queue.LifoQueue()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, cached_statements=256)
+        for p in PRAGMAS: conn.execute(p)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try: conn = self._idle.get_nowait()
+        except queue.Empty: conn = self._open()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            if self._idle.qsize() < self.size: self._idle.put(conn)
+            else: conn.close()
+
+    def close(self):
+        while True:
+            try: self._idle.get_nowait().close()
+            except queue.Empty: return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def connection():
+    """Borrow a pooled connection to DB_NAME: `with connection() as conn, conn: ...` for a transaction."""
+    with _pools_lock:
+        pool = _pools.get(DB_NAME)
+        if pool is None: pool = _pools[DB_NAME] = ConnectionPool(DB_NAME)
+    return pool.connection()
+
+class WriteBehind(threading.Thread):
+    """
+    Single background writer: applies queued write functions in batched transactions. Each write is
+    tagged with the user it belongs to, so a reader only waits for its own user's pending writes.
+    """
+
+    def __init__(self, batch=100):
+        super().__init__(name="db-write-behind", daemon=True)
+        self.batch = batch
+        self.queue = queue.Queue()
+        self.pending = {}   # username (None = unknown, everyone waits) -> queued writes
+        self._cond = threading.Condition()
+
+    def submit(self, fn, *args, username=None):
+        with self._cond: self.pending[username] = self.pending.get(username, 0) + 1
+        self.queue.put((fn, args, username))
+
+    def _waiting(self, username):
+        if username is None: return bool(self.pending)
+        return username in self.pending or None in self.pending
+
+    def flush(self, username=None):
+        """Block until `username`'s queued writes (everyone's when None) are on disk."""
+        with self._cond: self._cond.wait_for(lambda: not self._waiting(username))
+
+    def _done(self, jobs):
+        with self._cond:
+            for _, _, username in jobs:
+                self.pending[username] -= 1
+                if not self.pending[username]: del self.pending[username]
+            self._cond.notify_all()
+
+    def _apply(self, jobs):
+        with connection() as conn, conn:
+            for fn, args, _ in jobs: fn(conn, *args)
+
+    def run(self):
+        while True:
+            jobs = [self.queue.get()]
+            while len(jobs) < self.batch:
+                try: jobs.append(self.queue.get_nowait())
+                except queue.Empty: break
+            try:
+                self._apply(jobs)
+            except Exception as e:
+                # One bad write must not take the rest of the batch with it: redo them one by one
+                logging.warning("write-behind batch of %d failed (%s), retrying one at a time", len(jobs), e)
+                for job in jobs:
+                    try: self._apply([job])
+                    except Exception as e:
+                        metrics.inc("wanderlust_stage_errors_total", stage="db.write_behind", error=type(e).__name__)
+                        logging.error("write-behind %s%r dropped: %s", job[0].__name__, job[1][:1], e)
+            finally:
+                self._done(jobs)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def _write(fn, *args, username=None):
+    global _writer
+    if not WRITE_BEHIND:
+        with connection() as conn, conn: fn(conn, *args)
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehind()
+            _writer.start()
+            atexit.register(_writer.flush)
+    _writer.submit(fn, *args, username=username)
+
+def flush_writes(username=None):
+    """
+    Read-your-writes: wait for `username`'s queued writes (or all of them) before reading. Other
+    users' pending writes are not waited for, and when nothing is queued this is a dict check.
+    """
+    if _writer is not None and _writer.pending: _writer.flush(username)
+
+def _create_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users
                  (username TEXT PRIMARY KEY, password TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS history
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, 
+    conn.execute('''CREATE TABLE IF NOT EXISTS history
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT,
                   destination TEXT, trip_data JSON, notes TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit()
-    conn.close()
 
+def _add_history_summaries(conn):
+    """Sidebar columns so listing history never reads trip_data, plus the index its query walks."""
+    conn.execute("ALTER TABLE history ADD COLUMN title TEXT")
+    conn.execute("ALTER TABLE history ADD COLUMN duration INTEGER")
+    conn.execute("ALTER TABLE history ADD COLUMN total_cost INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_created ON history(username, created_at)")
+    rows = conn.execute("SELECT id, trip_data FROM history").fetchall()
+    for tid, djson in rows:
+        try: data = json.loads(djson)
+        except (TypeError, ValueError): data = {}
+        conn.execute("UPDATE history SET title=?, duration=?, total_cost=? WHERE id=?", (*trip_summary(data), tid))
+
+def _seed_samples(conn):
+    """Canonical payloads to train the first dictionary on: existing trips plus offline fallback plans."""
+    from src.static_data import get_smart_fallback
+    samples = []
+    for (djson,) in conn.execute("SELECT trip_data FROM history WHERE trip_data IS NOT NULL ORDER BY id DESC LIMIT 500"):
+        try: samples.append(blobs.canonical(json.loads(djson)))
+        except (TypeError, ValueError): pass
+    for dest, days, kind in (("Goa, India", 3, "Solo"), ("Paris, France", 5, "Couple"), ("Manali, India", 4, "Friends")):
+        samples.append(blobs.canonical(get_smart_fallback(dest, days, kind)))
+    return samples
+
+def _add_trip_blobs(conn):
+    """Trip payloads move to deduplicated, compressed blobs; history rows point at them by hash."""
+    conn.execute("CREATE TABLE IF NOT EXISTS trip_dicts (id INTEGER PRIMARY KEY, data BLOB)")
+    conn.execute("CREATE TABLE IF NOT EXISTS trip_blobs (hash TEXT PRIMARY KEY, dict_id INTEGER, data BLOB, raw_size INTEGER)")
+    conn.execute("ALTER TABLE history ADD COLUMN blob_hash TEXT")
+    add_dictionary(conn, blobs.train_dictionary(_seed_samples(conn)))
+
+def _add_trip_search(conn):
+    """FTS5 index over each trip's text, rowid = history.id. Skipped when SQLite lacks FTS5 (search_trips then uses LIKE)."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS trip_fts USING fts5(title, activities, hotels, dining, notes, "
+                     "tokenize='unicode61 remove_diacritics 2')")
+    except sqlite3.OperationalError as e:
+        logging.warning("full-text search disabled: %s", e)
+        return
+    rows = conn.execute(f"SELECT id, destination, trip_data, b.dict_id, b.data, notes FROM {_ROW_PAYLOAD}").fetchall()
+    for tid, dest, djson, dict_id, data, note in rows:
+        try: trip = json.loads(_payload(conn, djson, dict_id, data))
+        except (TypeError, ValueError): trip = {}
+        conn.execute("INSERT INTO trip_fts (rowid, title, activities, hotels, dining, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                     (tid, *trip_search_text(dest, trip), note or ""))
+
+# Applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = (_create_tables, _add_history_summaries, _add_trip_blobs, _add_trip_search)
+
+@metrics.timed("db.init_db")
+def init_db():
+    with connection() as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")  # one process migrates, the others wait and then see the new version
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for v, migrate in enumerate(MIGRATIONS[version:], version + 1):
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version={v}")
+    _fts.pop(DB_NAME, None)
+
+@metrics.timed("db.add_user")
 def add_user(username, password):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
-        conn.commit()
-        conn.close()
+        with connection() as conn, conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
         return True
-    except:
+    except sqlite3.Error:
         return False
 
+@metrics.timed("db.check_login")
 def check_login(username, password):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-    user = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        user = conn.execute("SELECT 1 FROM users WHERE username=? AND password=?", (username, password)).fetchone()
     return user is not None
 
+def trip_summary(trip_data):
+    """(title, days, total ₹) shown in the history list: the trip's own estimate, else the sum of its activities."""
+    trip = Itinerary.from_dict(trip_data)
+    return trip.trip_title, len(trip.days), trip.total_inr or sum(d.total_inr for d in trip.days)
+
+# Dictionaries never change once written, so they are cached per (database, id)
+_zdicts = {}
+
+def add_dictionary(conn, zdict):
+    """Store a new preset dictionary; blobs written from now on use it. Returns its id."""
+    cur = conn.execute("INSERT INTO trip_dicts (data) VALUES (?)", (zdict,))
+    _zdicts.pop((DB_NAME, "latest"), None)
+    return cur.lastrowid
+
+def _zdict(conn, dict_id):
+    key = (DB_NAME, dict_id)
+    if key not in _zdicts:
+        if dict_id == "latest":
+            row = conn.execute("SELECT id FROM trip_dicts ORDER BY id DESC LIMIT 1").fetchone()
+            _zdicts[key] = row[0] if row else None
+        else:
+            _zdicts[key] = conn.execute("SELECT data FROM trip_dicts WHERE id=?", (dict_id,)).fetchone()[0]
+    return _zdicts[key]
+
+def store_blob(conn, raw):
+    """Canonical payload bytes -> content hash; identical trips share one compressed row."""
+    h = blobs.content_hash(raw)
+    if conn.execute("SELECT 1 FROM trip_blobs WHERE hash=?", (h,)).fetchone() is None:
+        dict_id = _zdict(conn, "latest")
+        zdict = _zdict(conn, dict_id) if dict_id is not None else None
+        # OR IGNORE: the SELECT runs before the write lock, so a concurrent save may have just stored it
+        conn.execute("INSERT OR IGNORE INTO trip_blobs (hash, dict_id, data, raw_size) VALUES (?, ?, ?, ?)",
+                     (h, dict_id, blobs.compress(raw, zdict), len(raw)))
+    return h
+
+def _payload(conn, trip_json, dict_id, data):
+    """JSON text of a history row, whether it is still inline (pre-migration) or a blob."""
+    if data is None: return trip_json
+    return blobs.decompress(data, _zdict(conn, dict_id) if dict_id is not None else None).decode("utf-8")
+
+_ROW_PAYLOAD = "history LEFT JOIN trip_blobs b ON b.hash = history.blob_hash"
+
+def trip_search_text(destination, trip_data):
+    """(title, activities, hotels, dining) columns of the full-text index."""
+    trip = Itinerary.from_dict(trip_data)
+    return (f"{trip.trip_title} {destination}",
+            " · ".join(f"{a.activity}: {a.description} ({a.location})" for d in trip.days for a in d.activities),
+            " · ".join(f"{h.name} ({h.location})" for h in trip.hotels),
+            " · ".join(f"{f.name} - {f.type} ({f.location})" for f in trip.dining))
+
+_fts = {}
+
+def _has_fts(conn):
+    if DB_NAME not in _fts:
+        _fts[DB_NAME] = conn.execute("SELECT 1 FROM sqlite_master WHERE name='trip_fts'").fetchone() is not None
+    return _fts[DB_NAME]
+
+def _save_trip(conn, username, destination, raw, summary=("", 0, 0), text=None):
+    cur = conn.execute("INSERT INTO history (username, destination, blob_hash, notes, title, duration, total_cost) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (username, destination, store_blob(conn, raw), "", *summary))
+    if text and _has_fts(conn):
+        conn.execute("INSERT INTO trip_fts (rowid, title, activities, hotels, dining, notes) VALUES (?, ?, ?, ?, ?, '')",
+                     (cur.lastrowid, *text))
+
+@metrics.timed("db.save_trip")
 def save_trip(username, destination, trip_data):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO history (username, destination, trip_data, notes) VALUES (?, ?, ?, ?)", 
-              (username, destination, json.dumps(trip_data), ""))
-    conn.commit()
-    conn.close()
+    _write(_save_trip, username, destination, blobs.canonical(trip_data), trip_summary(trip_data),
+           trip_search_text(destination, trip_data), username=username)
 
+@metrics.timed("db.get_history")
 def get_history(username):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT id, destination, trip_data, notes, created_at FROM history WHERE username=? ORDER BY created_at DESC", (username,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def update_note(trip_id, note_text):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE history SET notes=? WHERE id=?", (note_text, trip_id))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    flush_writes(username)
+    with connection() as conn:
+        rows = conn.execute(f"SELECT id, destination, trip_data, b.dict_id, b.data, notes, created_at FROM {_ROW_PAYLOAD} "
+                            "WHERE username=? ORDER BY created_at DESC", (username,)).fetchall()
+        return [(tid, dest, _payload(conn, djson, dict_id, data), note, created)
+                for tid, dest, djson, dict_id, data, note, created in rows]
+
+@metrics.timed("db.get_history_page")
+def get_history_page(username, before=None, limit=20):
+    """
+    One page of summaries, newest first, without trip payloads. Keyset pagination: pass the returned
+    cursor as `before` for the next page (None when there is none), so page N costs the same as page 1.
+    Rows are (id, destination, title, duration, total_cost, notes, created_at).
+    """
+    flush_writes(username)
+    sql = "SELECT id, destination, title, duration, total_cost, notes, created_at FROM history WHERE username=?"
+    args = [username]
+    if before is not None:
+        sql += " AND (created_at, id) < (?, ?)"
+        args += before
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    with connection() as conn:
+        rows = conn.execute(sql, (*args, limit + 1)).fetchall()
+    if len(rows) <= limit: return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1][6], rows[-1][0])
+
+@metrics.timed("db.get_trip")
+def get_trip(trip_id, username=None):
+    """The stored trip dict, loaded only when a plan is opened; None if missing (or not `username`'s)."""
+    flush_writes(username)
+    sql, args = f"SELECT trip_data, b.dict_id, b.data FROM {_ROW_PAYLOAD} WHERE id=?", [trip_id]
+    if username is not None:
+        sql += " AND username=?"
+        args.append(username)
+    with connection() as conn:
+        row = conn.execute(sql, args).fetchone()
+        return json.loads(_payload(conn, *row)) if row else None
+
+# Column weights for bm25: a hit in the title outranks one buried in a description
+_FTS_WEIGHTS = (10.0, 4.0, 2.0, 2.0, 1.0)
+
+def _fts_query(text):
+    """User text -> FTS5 query: every word must match, each as a prefix ('river cru' finds 'river cruise')."""
+    words = "".join(c if c.isalnum() else " " for c in str(text)).split()
+    return " ".join(f'"{w}"*' for w in words)
+
+@metrics.timed("db.search_trips")
+def search_trips(username, query, limit=20):
+    """
+    Best-matching trips for `query`, ranked by bm25. Rows match get_history_page's shape with a snippet in place
+    of notes: (id, destination, title, duration, total_cost, snippet, created_at), matches wrapped in ** for Markdown.
+    """
+    match = _fts_query(query)
+    if not match: return []
+    flush_writes(username)
+    with connection() as conn:
+        if not _has_fts(conn):
+            like = f"%{query.strip()}%"
+            return conn.execute("SELECT id, destination, title, duration, total_cost, title, created_at FROM history "
+                                "WHERE username=? AND (title LIKE ? OR destination LIKE ? OR notes LIKE ?) "
+                                "ORDER BY created_at DESC LIMIT ?", (username, like, like, like, limit)).fetchall()
+        return conn.execute(
+            "SELECT h.id, h.destination, h.title, h.duration, h.total_cost, "
+            "snippet(trip_fts, -1, '**', '**', '…', 12), h.created_at "
+            "FROM trip_fts JOIN history h ON h.id = trip_fts.rowid "
+            f"WHERE trip_fts MATCH ? AND h.username=? ORDER BY bm25(trip_fts, {', '.join(map(str, _FTS_WEIGHTS))}) LIMIT ?",
+            (match, username, limit)).fetchall()
+
+def _update_note(conn, trip_id, note_text):
+    conn.execute("UPDATE history SET notes=? WHERE id=?", (note_text, trip_id))
+    if _has_fts(conn): conn.execute("UPDATE trip_fts SET notes=? WHERE rowid=?", (note_text, trip_id))
+
+@metrics.timed("db.update_note")
+def update_note(trip_id, note_text, username=None):
+    """`username` (the trip's owner) lets write-behind readers of other users skip waiting for it."""
+    _write(_update_note, trip_id, note_text, username=username)
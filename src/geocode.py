@@ -0,0 +1,102 @@
+# src/geocode.py
+# Nominatim client: persistent coordinate cache, single-flight lookups, pooled HTTP, global 1 req/s.
+import concurrent.futures as cf
+import logging
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from src import cache, metrics
+from src.ratelimit import SharedLimiter
+
+NOMINATIM_URL = os.getenv("WANDERLUST_NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+USER_AGENT = "wanderlust_pro_v8_final"
+GEOCODE_TTL = 30 * 24 * 3600   # coordinates of a place name hardly ever change
+MISS_TTL = 24 * 3600           # remember "not found" for a day
+# Nominatim usage policy: at most 1 request per second for the whole application, not per worker
+LIMITER = SharedLimiter("nominatim", float(os.getenv("WANDERLUST_NOMINATIM_INTERVAL", "1.0")), cache.CACHE_DB)
+
+_session = None
+_session_lock = threading.Lock()
+
+def session():
+    """Process-wide pooled session (keep-alive connections to Nominatim)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            s.headers["User-Agent"] = USER_AGENT
+            s.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            _session = s
+        return _session
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader: fut = self._calls[key] = cf.Future()
+        if not leader: return fut.result()
+        try:
+            result = fn()
+            fut.set_result(result)
+            return result
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock: self._calls.pop(key, None)
+
+_flight = SingleFlight()
+
+def _norm(q): return " ".join(str(q).lower().split())
+
+@metrics.timed("nominatim")  # failures are counted here even where callers swallow them
+def _get(path, params, timeout):
+    LIMITER.acquire()
+    res = session().get(f"{NOMINATIM_URL}/{path}", params={**params, "format": "json"}, timeout=timeout)
+    res.raise_for_status()
+    return res.json()
+
+def search(query, limit=5, timeout=2):
+    """Nominatim search -> [{"name", "lat", "lon"}]. Results also seed the coordinate cache."""
+    key = cache.make_key(q=_norm(query), limit=limit)
+    hit = cache.safe_get("geocode_search", key, ttl=GEOCODE_TTL)
+    if hit is not None: return hit
+
+    def fetch():
+        rows = _get("search", {"q": query, "addressdetails": 1, "limit": limit}, timeout)
+        out = [{"name": r.get("display_name"), "lat": float(r["lat"]), "lon": float(r["lon"])} for r in rows if r.get("display_name")]
+        for r in out: cache.safe_put("geocode", cache.make_key(q=_norm(r["name"])), [r["lat"], r["lon"]])
+        cache.safe_put("geocode_search", key, out)
+        return out
+    return _flight.do(("search", key), fetch)
+
+def geocode(place_name, timeout=10):
+    """(lat, lon) or None. Cached on disk, coalesced in process, rate limited across processes."""
+    key = cache.make_key(q=_norm(place_name))
+    hit = cache.safe_get("geocode", key, ttl=GEOCODE_TTL)
+    if hit: return tuple(hit)
+    if cache.safe_get("geocode_miss", key, ttl=MISS_TTL) is not None: return None
+
+    def fetch():
+        hit = cache.safe_get("geocode", key, ttl=GEOCODE_TTL)  # another worker may have just stored it
+        if hit: return tuple(hit)
+        try: rows = _get("search", {"q": place_name, "limit": 1}, timeout)
+        except Exception as e:
+            logging.warning("geocode %r failed: %s", place_name, e)
+            return None  # network trouble is not cached as a miss
+        if not rows:
+            cache.safe_put("geocode_miss", key, True)
+            return None
+        coords = (float(rows[0]["lat"]), float(rows[0]["lon"]))
+        cache.safe_put("geocode", key, list(coords))
+        return coords
+    return _flight.do(("geocode", key), fetch)
@@ -0,0 +1,108 @@
+# src/health.py
+# Per-provider health: EWMA latency / error rate and a circuit breaker with half-open probing.
+import os
+import statistics
+import threading
+import time
+
+EWMA_ALPHA = float(os.getenv("WANDERLUST_HEALTH_ALPHA", "0.3"))
+FAILURE_THRESHOLD = int(os.getenv("WANDERLUST_BREAKER_FAILURES", "3"))
+COOLDOWN = float(os.getenv("WANDERLUST_BREAKER_COOLDOWN", "60"))
+# Errors that will not fix themselves (retired model, bad key): keep the breaker open much longer
+PERMANENT_ERRORS = ("404", "not found", "decommissioned", "deprecated", "invalid api key", "permission")
+PERMANENT_COOLDOWN = float(os.getenv("WANDERLUST_BREAKER_PERMANENT_COOLDOWN", "3600"))
+# Seconds assumed for a provider with no successful call yet, when no other provider has one either
+PRIOR_LATENCY = float(os.getenv("WANDERLUST_HEALTH_PRIOR_LATENCY", "5"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class ProviderHealth:
+    __slots__ = ("name", "latency", "error_rate", "calls", "failures", "streak", "state",
+                 "opened_at", "cooldown", "probing", "last_error", "last_ok")
+
+    def __init__(self, name):
+        self.name = name
+        self.latency = None      # EWMA seconds of successful calls
+        self.error_rate = 0.0    # EWMA of failures (0..1)
+        self.calls = self.failures = self.streak = 0
+        self.state, self.opened_at, self.cooldown, self.probing = CLOSED, 0.0, COOLDOWN, False
+        self.last_error, self.last_ok = None, None
+
+    def score(self, prior=PRIOR_LATENCY):
+        # Expected seconds to a good answer. A provider with no latency sample yet is assumed to be
+        # as fast as `prior`, so its error rate still sinks it below the providers that do answer.
+        return (prior if self.latency is None else self.latency) / max(0.05, 1.0 - self.error_rate)
+
+    def as_dict(self):
+        return {"state": self.state, "ewma_latency": None if self.latency is None else round(self.latency, 3),
+                "error_rate": round(self.error_rate, 3), "calls": self.calls, "failures": self.failures,
+                "consecutive_failures": self.streak, "last_error": self.last_error, "last_ok": self.last_ok,
+                "retry_in": max(0.0, round(self.opened_at + self.cooldown - time.time(), 1)) if self.state == OPEN else 0.0}
+
+class HealthRegistry:
+    def __init__(self, alpha=EWMA_ALPHA, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.alpha, self.threshold, self.cooldown = alpha, threshold, cooldown
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def _get(self, name):
+        p = self._providers.get(name)
+        if p is None: p = self._providers[name] = ProviderHealth(name)
+        return p
+
+    def _available(self, p, now):
+        if p.state == CLOSED: return True
+        if p.state == OPEN: return now - p.opened_at >= p.cooldown
+        return not p.probing
+
+    def allow(self, name):
+        """Claim a call slot. An open breaker past its cooldown lets exactly one probe through."""
+        with self._lock:
+            p, now = self._get(name), time.time()
+            if not self._available(p, now): return False
+            if p.state != CLOSED: p.state, p.probing = HALF_OPEN, True
+            return True
+
+    def record(self, name, ok, latency=None, error=None):
+        with self._lock:
+            p, now = self._get(name), time.time()
+            p.calls += 1
+            p.error_rate += self.alpha * ((0.0 if ok else 1.0) - p.error_rate)
+            p.probing = False
+            if ok:
+                if latency is not None:
+                    p.latency = latency if p.latency is None else p.latency + self.alpha * (latency - p.latency)
+                p.streak, p.state, p.last_ok = 0, CLOSED, now
+                return
+            p.failures += 1
+            p.streak += 1
+            p.last_error = str(error)[:200] if error else "failed"
+            permanent = any(k in p.last_error.lower() for k in PERMANENT_ERRORS)
+            if p.state == HALF_OPEN or p.streak >= self.threshold or permanent:
+                p.state, p.opened_at = OPEN, now
+                p.cooldown = PERMANENT_COOLDOWN if permanent else self.cooldown
+
+    def release(self, name):
+        """Give back a half-open probe slot that ended without an outcome (generator closed, thread
+        torn down). A no-op once record() has run, so callers can simply do it in a finally."""
+        with self._lock:
+            p = self._providers.get(name)
+            if p is not None: p.probing = False
+
+    def rank(self, names):
+        """Names whose breaker would admit a call, fastest expected success first (ties keep input order)."""
+        with self._lock:
+            now, known = time.time(), [p.latency for p in self._providers.values() if p.latency is not None]
+            prior = statistics.median(known) if known else PRIOR_LATENCY  # unmeasured = a typical provider
+            live = [(self._get(n).score(prior), i, n) for i, n in enumerate(names) if self._available(self._get(n), now)]
+        return [n for _, _, n in sorted(live)]
+
+    def snapshot(self):
+        """JSON-ready {provider: stats} for dashboards."""
+        with self._lock:
+            return {n: p.as_dict() for n, p in self._providers.items()}
+
+    def reset(self):
+        with self._lock: self._providers.clear()
+
+HEALTH = HealthRegistry()
@@ -0,0 +1,144 @@
+# src/json_stream.py
+# Incremental parser for streamed itinerary JSON.
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+SECTIONS = {"days": "day", "hotel_recommendations": "hotel", "dining_recommendations": "dining"}
+
+class ItineraryStreamParser:
+    """
+    Feed raw model output chunk by chunk. Every element of `days`, `hotel_recommendations`
+    and `dining_recommendations` is returned as soon as its closing brace arrives, and top-level
+    string fields (trip_title, ...) as soon as their closing quote arrives.
+    Anything before the first '{' (code fences, chatter) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.stack = []
+        self.in_str = False
+        self.esc = False
+        self.str_start = None
+        self.key = None          # last key seen in the top-level object
+        self.expect_value = False
+        self.section = None      # top-level array currently being read
+        self.item_start = None   # start of the element currently being read
+        self.closed = False
+
+    def feed(self, chunk):
+        """Consume `chunk`; returns a list of (kind, payload) events completed by it."""
+        events = []
+        self.text += chunk or ""
+        text = self.text
+        for i in range(self.pos, len(text)):
+            ch = text[i]
+            if self.closed: break
+            if self.in_str:
+                if self.esc: self.esc = False
+                elif ch == "\\": self.esc = True
+                elif ch == '"':
+                    self.in_str = False
+                    if len(self.stack) == 1: self._top_level_string(text[self.str_start:i + 1], events)
+                continue
+            if not self.stack and ch != "{": continue
+            if ch == '"':
+                self.in_str, self.str_start = True, i
+            elif ch == ":" and len(self.stack) == 1:
+                self.expect_value = True
+            elif ch == ",":
+                if len(self.stack) == 1: self.expect_value = False
+            elif ch in "{[":
+                if len(self.stack) == 1:
+                    self.expect_value = False
+                    if ch == "[" and self.key in SECTIONS: self.section = SECTIONS[self.key]
+                elif len(self.stack) == 2 and ch == "{" and self.section and self.stack[1] == "[":
+                    self.item_start = i
+                self.stack.append(ch)
+            elif ch in "}]":
+                if not self.stack: continue
+                self.stack.pop()
+                if len(self.stack) == 2 and ch == "}" and self.item_start is not None:
+                    self._emit(self.section, text[self.item_start:i + 1], events)
+                    self.item_start = None
+                elif len(self.stack) == 1 and ch == "]":
+                    self.section = None
+                elif not self.stack:
+                    self.closed = True
+        self.pos = len(text)
+        return events
+
+    def _top_level_string(self, raw, events):
+        try: value = json.loads(raw)
+        except ValueError: return
+        if self.expect_value:
+            events.append(("field", {self.key: value}))
+            self.expect_value = False
+        else:
+            self.key = value
+
+    def _emit(self, kind, raw, events):
+        try: events.append((kind, json.loads(raw)))
+        except ValueError: pass
+
+def iter_events(data):
+    """Replay an already complete itinerary dict as the events the parser would have produced."""
+    for k, v in data.items():
+        if k in SECTIONS:
+            for item in v or []: yield SECTIONS[k], item
+        elif isinstance(v, str):
+            yield "field", {k: v}
+
+def _loads(raw):
+    # strict=False: models love raw newlines inside strings
+    try: return json.loads(raw, strict=False)
+    except ValueError: pass
+    try: return json.loads(_TRAILING_COMMA.sub(r"\1", raw), strict=False)  # `[1, 2,]` style slips
+    except ValueError: return None
+
+def scan_json(text, repair=True):
+    """
+    Single linear pass over `text`: returns the first balanced top-level {...} object.
+    Code fences and chatter around it are skipped. If the object is cut off (truncated output) and
+    `repair` is set, it is cut back to the last complete value and its open containers are closed.
+    """
+    if not text: return None
+    start = text.find("{")
+    if start < 0: return None
+    stack, in_str, esc, key_pos, prev = [], False, False, False, ""
+    safe = None  # (end index, open containers) of the last point where every value was complete
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if esc: esc = False
+            elif ch == "\\": esc = True
+            elif ch == '"':
+                in_str = False
+                if not key_pos: safe = (i + 1, "".join(stack))
+            prev = '"'
+            continue
+        if ch.isspace(): continue
+        if ch == '"':
+            # a string directly inside an object and not after ':' is a key, cutting after it is not safe
+            in_str, key_pos = True, bool(stack) and stack[-1] == "{" and prev in "{,"
+        elif ch in "{[":
+            stack.append(ch)
+            safe = (i + 1, "".join(stack))
+        elif ch in "}]":
+            if stack: stack.pop()
+            if not stack: return _loads(text[start:i + 1])
+            safe = (i + 1, "".join(stack))
+        elif ch == ",":
+            safe = (i, "".join(stack))
+        prev = ch
+    if not repair or not safe: return None
+    end, open_ = safe
+    closers = "".join("}" if c == "{" else "]" for c in reversed(open_))
+    return _prune(_loads(text[start:end].rstrip().rstrip(",") + closers))
+
+def _prune(v):
+    # Closing a cut-off element can leave `{}` / `[]` stubs behind; drop them from lists
+    if isinstance(v, dict): return {k: _prune(x) for k, x in v.items()}
+    if isinstance(v, list): return [_prune(x) for x in v if not (isinstance(x, (dict, list)) and not x)]
+    return v
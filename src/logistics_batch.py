@@ -0,0 +1,85 @@
+# src/logistics_batch.py
+# Many-to-many logistics: one NumPy pass over the whole origin x destination grid.
+#
+# Distances use Lambert's formula on the WGS-84 ellipsoid (a closed-form Vincenty approximation).
+# Up to GEODESIC_BEYOND_KM it stays within 0.21 km of the scalar path (geopy.geodesic), so after
+# the same int() truncation `distance_km` differs by at most 1 km, and each cost by at most that
+# mode's per-km rate (₹12 for car) in INR / ₹1 in USD. Lambert degrades near the antipode (~26 km
+# off), so the few pairs beyond the cutoff are recomputed with geodesic itself and keep the bound
+# everywhere. benchmarks/bench_logistics.py checks this.
+import numpy as np
+from src.navigation import get_coordinates, TRANSPORT_RATES, INR_PER_USD
+
+WGS84_A = 6378.137            # km
+WGS84_F = 1 / 298.257223563
+GEODESIC_BEYOND_KM = 18000.0  # Lambert's error passes 0.2 km past this (antipodal is ~20000 km)
+
+def distance_matrix_km(origins, destinations):
+    """(N, 2) and (M, 2) arrays of (lat, lon) degrees -> (N, M) float km."""
+    o = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    d = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+    # reduced latitudes
+    b1 = np.arctan((1 - WGS84_F) * np.tan(o[:, 0]))[:, None]
+    b2 = np.arctan((1 - WGS84_F) * np.tan(d[:, 0]))[None, :]
+    dlon = d[None, :, 1] - o[:, None, 1]
+    # central angle on the auxiliary sphere (haversine form, stable for short distances)
+    h = np.sin((b2 - b1) / 2) ** 2 + np.cos(b1) * np.cos(b2) * np.sin(dlon / 2) ** 2
+    sigma = 2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+    p, q = (b1 + b2) / 2, (b2 - b1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (sigma - np.sin(sigma)) * np.sin(p) ** 2 * np.cos(q) ** 2 / np.cos(sigma / 2) ** 2
+        y = (sigma + np.sin(sigma)) * np.cos(p) ** 2 * np.sin(q) ** 2 / np.sin(sigma / 2) ** 2
+    corr = np.nan_to_num(x) + np.nan_to_num(y)
+    km = WGS84_A * (sigma - WGS84_F / 2 * corr)
+    far = np.argwhere(km > GEODESIC_BEYOND_KM)
+    if len(far):
+        from geopy.distance import geodesic  # deferred like navigation's: only near-antipodal pairs need it
+        deg_o, deg_d = np.degrees(o), np.degrees(d)
+        for i, j in far: km[i, j] = geodesic(tuple(deg_o[i]), tuple(deg_d[j])).km
+    return km
+
+def costs_matrix(dist_km):
+    """Vectorised navigation.calculate_costs: {mode: {"inr": int array, "usd": int array}}."""
+    out = {}
+    for mode, (base, per_km) in TRANSPORT_RATES.items():
+        inr = base + dist_km * per_km
+        out[mode] = {"inr": inr.astype(np.int64), "usd": (inr / INR_PER_USD).astype(np.int64)}
+    return out
+
+def hours_matrix(dist_km):
+    """Vectorised travel hours (the scalar path formats these as '<n>h')."""
+    return {"flight": np.maximum(1, dist_km // 800 + 2), "train": np.maximum(1, dist_km // 70), "car": dist_km // 60}
+
+def batch_logistics_from_coords(origin_coords, destination_coords):
+    dist = distance_matrix_km(origin_coords, destination_coords).astype(np.int64)
+    return {"distance_km": dist, "costs": costs_matrix(dist), "hours": hours_matrix(dist)}
+
+def batch_trip_logistics(origins, destinations):
+    """
+    N origin x M destination names -> matrices of shape (N', M') over the places that geocoded.
+    Names that could not be resolved are listed under "unresolved" and left out of the grid.
+    """
+    def resolve(names):
+        kept, coords, missing = [], [], []
+        for n in names:
+            c = get_coordinates(n)
+            if c: kept.append(n); coords.append(c)
+            else: missing.append(n)
+        return kept, coords, missing
+
+    o_names, o_coords, o_missing = resolve(origins)
+    d_names, d_coords, d_missing = resolve(destinations)
+    if not o_coords or not d_coords:
+        return {"origins": o_names, "destinations": d_names, "unresolved": o_missing + d_missing,
+                "distance_km": np.zeros((len(o_coords), len(d_coords)), dtype=np.int64), "costs": {}, "hours": {}}
+    result = batch_logistics_from_coords(o_coords, d_coords)
+    result.update(origins=o_names, destinations=d_names, unresolved=o_missing + d_missing)
+    return result
+
+def cheapest(result, mode="train", limit=10):
+    """[(origin, destination, inr)] sorted by `mode` cost, e.g. the cheapest of 50 cities from Delhi."""
+    if mode not in result["costs"]: return []
+    inr = result["costs"][mode]["inr"]
+    order = np.argsort(inr, axis=None)[:limit]
+    rows, cols = np.unravel_index(order, inr.shape)
+    return [(result["origins"][r], result["destinations"][c], int(inr[r, c])) for r, c in zip(rows, cols)]
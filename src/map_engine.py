@@ -1,32 +1,131 @@
-import folium
-from streamlit_folium import st_folium
+import os
+import threading
+from collections import OrderedDict
+from src import blobs
+from src.places import find_place
 
-def plot_itinerary_map(itinerary_json):
+# "cluster" = one GeoJSON layer + client-side clustering + day routes; "markers" = one folium.Marker per activity
+MAP_MODE = os.getenv("WANDERLUST_MAP_MODE", "cluster")
+MAP_CACHE_SIZE = int(os.getenv("WANDERLUST_MAP_CACHE", "32"))  # rendered maps kept in memory
+DAY_COLORS = ["#e6194b", "#3cb44b", "#4363d8", "#f58231", "#911eb4", "#42d4f4", "#f032e6", "#9a6324"]
+
+def _markers_map(itinerary_json):
+    import folium  # folium costs ~0.9 s to import; only paid once a map is actually drawn
     # Default to a central location if data is missing
     m = folium.Map(location=[20, 0], zoom_start=2)
-    
+
     locations = []
-    
+
     if "days" in itinerary_json:
-        for day in itinerary_json['days']:
-            for activity in day['activities']:
-                loc_str = activity.get('location', '')
+        for day in itinerary_json['days'] or []:
+            if not isinstance(day, dict): continue
+            for activity in day.get('activities') or []:
+                if not isinstance(activity, dict): continue
+                # Model output is loose: null locations and missing names must not break the page
+                loc_str = str(activity.get('location') or '')
+                name = str(activity.get('activity') or '')
                 try:
                     # Parse "Lat,Lon" string
                     if "," in loc_str:
                         lat, lon = map(float, loc_str.split(','))
                         folium.Marker(
                             [lat, lon],
-                            popup=f"Day {day['day']}: {activity['activity']}",
-                            tooltip=activity['activity'],
+                            popup=f"Day {day.get('day', '')}: {name}",
+                            tooltip=name,
                             icon=folium.Icon(color="blue", icon="info-sign")
                         ).add_to(m)
                         locations.append([lat, lon])
-                except:
+                except (TypeError, ValueError):  # not a 'lat,lon' pair
                     continue
 
     # Auto-zoom to fit markers
     if locations:
         m.fit_bounds(locations)
-    
-    return m
\ No newline at end of file
+
+    return m
+
+def resolve_location(text):
+    """'12.97,77.59' -> (lat, lon); else the offline gazetteer, trying 'Baga Beach, Goa' then 'Goa'. None if unknown."""
+    text = str(text or "").strip()
+    if not text: return None
+    try:
+        lat, lon = map(float, text.split(","))
+        if -90 <= lat <= 90 and -180 <= lon <= 180: return lat, lon
+    except ValueError:
+        pass
+    parts = [p.strip() for p in text.split(",") if p.strip()]
+    for i in range(len(parts)):
+        place = find_place(", ".join(parts[i:]))
+        if place: return place.lat, place.lon
+    return None
+
+def itinerary_geojson(itinerary_json, default=None):
+    """
+    (points, routes) FeatureCollections. One Point per activity whose location resolves (or `default`
+    (lat, lon) when it doesn't), one LineString per day through that day's points in order.
+    """
+    points, routes = [], []
+    for d_idx, day in enumerate(itinerary_json.get("days") or []):
+        if not isinstance(day, dict): continue
+        day_no, path = day.get("day", d_idx + 1), []
+        color = DAY_COLORS[d_idx % len(DAY_COLORS)]
+        for act in day.get("activities") or []:
+            if not isinstance(act, dict): continue
+            coords = resolve_location(act.get("location")) or default
+            if not coords: continue
+            lat, lon = coords
+            points.append({"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                           "properties": {"day": f"Day {day_no}", "time": str(act.get("time", "")),
+                                          "activity": str(act.get("activity", "")), "location": str(act.get("location", "")),
+                                          "color": color}})
+            if not path or path[-1] != [lon, lat]: path.append([lon, lat])
+        if len(path) > 1:
+            routes.append({"type": "Feature", "geometry": {"type": "LineString", "coordinates": path},
+                           "properties": {"day": f"Day {day_no}", "color": color}})
+    return {"type": "FeatureCollection", "features": points}, {"type": "FeatureCollection", "features": routes}
+
+def _cluster_map(itinerary_json, default=None):
+    import folium
+    from folium.plugins import MarkerCluster
+    points, routes = itinerary_geojson(itinerary_json, default)
+    m = folium.Map(location=[20, 0], zoom_start=2)
+    if routes["features"]:
+        folium.GeoJson(routes, name="Routes",
+                       style_function=lambda f: {"color": f["properties"]["color"], "weight": 3, "opacity": 0.7},
+                       tooltip=folium.GeoJsonTooltip(fields=["day"], labels=False)).add_to(m)
+    if points["features"]:
+        # The whole layer goes into the cluster in one call; Leaflet.markercluster groups points client-side
+        cluster = MarkerCluster(name="Activities").add_to(m)
+        folium.GeoJson(points, marker=folium.CircleMarker(radius=7, fill=True, fill_opacity=0.9, weight=1),
+                       style_function=lambda f: {"color": f["properties"]["color"], "fillColor": f["properties"]["color"]},
+                       tooltip=folium.GeoJsonTooltip(fields=["activity"], labels=False),
+                       popup=folium.GeoJsonPopup(fields=["day", "time", "activity", "location"], labels=False)).add_to(cluster)
+        lats = [f["geometry"]["coordinates"][1] for f in points["features"]]
+        lons = [f["geometry"]["coordinates"][0] for f in points["features"]]
+        m.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]], max_zoom=13)
+    return m
+
+def plot_itinerary_map(itinerary_json, mode=None, default=None):
+    """folium.Map for an itinerary; `mode` defaults to MAP_MODE."""
+    if (mode or MAP_MODE) == "markers": return _markers_map(itinerary_json)
+    return _cluster_map(itinerary_json, default)
+
+_html = OrderedDict()
+_html_lock = threading.Lock()
+
+def itinerary_map_html(itinerary_json, mode=None, default=None):
+    """
+    Standalone HTML for components.html, memoised by itinerary content hash: reruns and reopening
+    a trip from history reuse the rendered page instead of rebuilding the map.
+    """
+    mode = mode or MAP_MODE
+    key = blobs.content_hash(blobs.canonical([itinerary_json, mode, default]))
+    with _html_lock:
+        if key in _html:
+            _html.move_to_end(key)
+            return _html[key]
+    html = plot_itinerary_map(itinerary_json, mode, default).get_root().render()
+    with _html_lock:
+        _html[key] = html
+        while len(_html) > MAP_CACHE_SIZE: _html.popitem(last=False)
+    return html
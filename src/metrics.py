@@ -0,0 +1,253 @@
+# src/metrics.py
+# In-process counters and latency histograms for the hot paths, exported in Prometheus text format.
+#
+#   with timed("geocode"): ...             # latency -> wanderlust_stage_seconds{stage="geocode"}
+#   @timed("db.save_trip")                 # same, as a decorator; exceptions also counted, then re-raised
+#   inc("wanderlust_itinerary_source_total", source="fallback")
+#
+# Export is opt-in: WANDERLUST_METRICS_PORT serves /metrics, WANDERLUST_METRICS_FILE is rewritten
+# every WANDERLUST_METRICS_INTERVAL seconds (for node_exporter's textfile collector).
+import atexit
+import bisect
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.getenv("WANDERLUST_METRICS", "1") == "1"
+METRICS_PORT = int(os.getenv("WANDERLUST_METRICS_PORT", "0"))       # 0 = no endpoint
+METRICS_FILE = os.getenv("WANDERLUST_METRICS_FILE")
+METRICS_INTERVAL = float(os.getenv("WANDERLUST_METRICS_INTERVAL", "15"))
+PROFILE = os.getenv("WANDERLUST_PROFILE", "0") == "1"                 # cProfile every profiled() block
+PROFILE_DIR = os.getenv("WANDERLUST_PROFILE_DIR", "profiles")
+# Seconds; spans a cache hit (sub-ms) up to a slow LLM call
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "wanderlust_stage_seconds": "Latency of a click-path stage (generation, geocoding, SQLite, fallback).",
+    "wanderlust_stage_errors_total": "Exceptions raised out of a stage, by exception type.",
+    "wanderlust_provider_seconds": "Latency of one LLM provider attempt, by outcome.",
+    "wanderlust_provider_calls_total": "LLM provider attempts by outcome (ok, error, invalid, circuit_open).",
+    "wanderlust_itinerary_source_total": "Itineraries served from the cache, a provider, or the offline fallback.",
+    "wanderlust_fallback_total": "Offline fallback plans built, catalog-backed or generic.",
+    "wanderlust_cache_requests_total": "Persistent cache lookups by namespace and result.",
+    "wanderlust_geocode_total": "Coordinate lookups by source (gazetteer, geocoder, miss, error).",
+    "wanderlust_tokens_total": "LLM tokens reported by providers.",
+    "wanderlust_api_rejected_total": "API calls refused with 503 because a worker pool's queue was full.",
+    "wanderlust_api_timeouts_total": "API calls answered 504 after their request timeout.",
+}
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs: return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot is +Inf
+        self.sum, self.count = 0.0, 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (what histogram_quantile would see)."""
+        if not self.count: return None
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target: return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}     # name -> {label key: value}
+        self._histograms = {}   # name -> {label key: Histogram}
+
+    def inc(self, name, value=1, **labels):
+        if not ENABLED: return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not ENABLED: return
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            h = series.get(key)
+            if h is None: h = series[key] = Histogram()
+            h.observe(seconds)
+
+    def snapshot(self):
+        """JSON-ready {name: {labels: value | {count, sum, p50, p95, p99}}} for dashboards and benchmarks."""
+        with self._lock:
+            out = {n: {_fmt_labels(k) or "{}": v for k, v in s.items()} for n, s in self._counters.items()}
+            for n, series in self._histograms.items():
+                out[n] = {_fmt_labels(k) or "{}": {"count": h.count, "sum": round(h.sum, 6), "p50": h.quantile(0.5),
+                                                   "p95": h.quantile(0.95), "p99": h.quantile(0.99)} for k, h in series.items()}
+            return out
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_fmt_labels(k)} {v}" for k, v in sorted(self._counters[name].items())]
+            for name in sorted(self._histograms):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+                for k, h in sorted(self._histograms[name].items()):
+                    cum = 0
+                    for i, n in enumerate(h.counts):
+                        cum += n
+                        le = repr(BUCKETS[i]) if i < len(BUCKETS) else "+Inf"
+                        lines.append(f"{name}_bucket{_fmt_labels(k, [('le', le)])} {cum}")
+                    lines.append(f"{name}_sum{_fmt_labels(k)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_fmt_labels(k)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+METRICS = Registry()
+inc, observe, snapshot, render = METRICS.inc, METRICS.observe, METRICS.snapshot, METRICS.render
+
+class timed:
+    """Context manager / decorator: stage latency, plus an error count when the block raises."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._t0 = threading.local()   # one decorator instance is shared by every thread calling it
+
+    def record(self, t0, exc_type=None):
+        observe("wanderlust_stage_seconds", time.perf_counter() - t0, stage=self.stage)
+        if exc_type is not None: inc("wanderlust_stage_errors_total", stage=self.stage, error=exc_type.__name__)
+
+    def __enter__(self):
+        self._t0.value = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record(self._t0.value, exc_type)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try: result = fn(*args, **kwargs)
+            except BaseException as e:
+                self.record(t0, type(e))
+                raise
+            self.record(t0)
+            return result
+        return wrapper
+
+# --- Export ---
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(port, host="127.0.0.1"):
+    """Background /metrics endpoint; returns the server (shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def write_file(path):
+    """Atomic rewrite, so a scraper never reads half a file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(render())
+    os.replace(tmp, path)
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+def start_exporter(port=None, path=None, interval=None):
+    """Start whatever export is configured (args override the env). Safe to call more than once."""
+    global _exporter_started
+    port = METRICS_PORT if port is None else port
+    path = METRICS_FILE if path is None else path
+    interval = METRICS_INTERVAL if interval is None else interval
+    with _exporter_lock:
+        if _exporter_started: return
+        _exporter_started = True
+    if port:
+        try: serve(port)
+        except OSError as e: logging.warning("metrics endpoint on port %s not started: %s", port, e)  # another worker has it
+    if path:
+        def loop():
+            while True:
+                time.sleep(interval)
+                try: write_file(path)
+                except OSError as e: logging.warning("metrics file %s not written: %s", path, e)
+        threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+        atexit.register(lambda: write_file(path))
+
+# --- Profiling ---
+
+_profile_lock = threading.Lock()
+
+class profiled:
+    """
+    cProfile one block (a single request) when `enabled` (default WANDERLUST_PROFILE): the stats are
+    dumped to PROFILE_DIR/<label>-<time>.prof and the top functions logged. One profile at a time;
+    concurrent blocks run unprofiled rather than fight over the profiler.
+    """
+
+    def __init__(self, label, enabled=None, top=15):
+        self.label, self.enabled, self.top = label, PROFILE if enabled is None else enabled, top
+        self.profiler, self.path = None, None
+
+    def __enter__(self):
+        if self.enabled and _profile_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is None: return False
+        try:
+            self.profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.path = os.path.join(PROFILE_DIR, f"{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+            self.profiler.dump_stats(self.path)
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(self.top)
+            logging.info("profile %s -> %s\n%s", self.label, self.path, out.getvalue())
+        except OSError as e:
+            logging.warning("profile %s not saved: %s", self.label, e)
+        finally:
+            self.profiler = None
+            _profile_lock.release()
+        return False
@@ -0,0 +1,129 @@
+# src/models.py
+# Typed, normalised itinerary. Built once per trip so the UI never re-parses cost strings.
+import re
+from dataclasses import dataclass, field
+
+_RUPEES = re.compile(r"₹\s*([\d,]+)")
+_NUMBER = re.compile(r"(\d[\d,]*)")
+
+def parse_cost(cost_str):
+    """'₹1,500' / '₹5,000 ($60)' / '1500' -> int rupees, 0 when no amount is found."""
+    if not cost_str: return 0
+    if isinstance(cost_str, (int, float)): return int(cost_str)
+    s = str(cost_str)
+    match = _RUPEES.search(s) or (None if "$" in s else _NUMBER.search(s))
+    if match: return int(match.group(1).replace(",", ""))
+    return 0
+
+def budget_tier(max_budget):
+    """Budget style the planner prompt uses for a total trip budget in rupees."""
+    if max_budget < 30000: return "Cheap"
+    if max_budget < 100000: return "Mid"
+    return "Lux"
+
+def _text(v, default=""):
+    return default if v is None else str(v).strip()
+
+def _rating(v):
+    try: return float(str(v).split("/")[0])
+    except (TypeError, ValueError): return None
+
+@dataclass(slots=True)
+class Activity:
+    time: str
+    activity: str
+    description: str
+    location: str
+    cost: str
+    cost_inr: int
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(_text(d.get("time")), _text(d.get("activity"), "Activity"), _text(d.get("description")),
+                   _text(d.get("location")), _text(d.get("cost")), parse_cost(d.get("cost")))
+
+@dataclass(slots=True)
+class Day:
+    day: int
+    activities: list = field(default_factory=list)
+    total_inr: int = 0
+
+    @classmethod
+    def from_dict(cls, d, fallback_no):
+        try: no = int(d.get("day", fallback_no))
+        except (TypeError, ValueError): no = fallback_no
+        acts = [Activity.from_dict(a) for a in d.get("activities") or [] if isinstance(a, dict)]
+        return cls(no, acts, sum(a.cost_inr for a in acts))
+
+@dataclass(slots=True)
+class Hotel:
+    name: str
+    location: str
+    rating: float
+    price_per_night: str
+    price_inr: int
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(_text(d.get("name"), "Hotel"), _text(d.get("location")), _rating(d.get("rating", "4.5")),
+                   _text(d.get("price_per_night")), parse_cost(d.get("price_per_night")))
+
+@dataclass(slots=True)
+class Dining:
+    name: str
+    type: str
+    location: str
+    price: str
+    price_inr: int
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(_text(d.get("name"), "Restaurant"), _text(d.get("type"), "Food"), _text(d.get("location")),
+                   _text(d.get("price")), parse_cost(d.get("price")))
+
+@dataclass(slots=True)
+class Itinerary:
+    trip_title: str
+    travel_persona: str
+    total_estimated_cost: str
+    total_inr: int
+    days: list
+    hotels: list
+    dining: list
+    safety_tips: str
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Normalise raw model/static output: drops non-dict entries, parses every cost once, and renumbers
+        days 1..N in the model's order (a repeated or skipped "day" would clash as a UI widget key).
+        """
+        d = d or {}
+        days = [Day.from_dict(x, i + 1) for i, x in enumerate(d.get("days") or []) if isinstance(x, dict)]
+        days.sort(key=lambda x: x.day)
+        for i, day in enumerate(days, 1): day.day = i
+        tips = d.get("safety_tips")
+        if isinstance(tips, list): tips = " ".join(map(str, tips))
+        return cls(_text(d.get("trip_title")), _text(d.get("travel_persona")), _text(d.get("total_estimated_cost")),
+                   parse_cost(d.get("total_estimated_cost")), days,
+                   [Hotel.from_dict(h) for h in d.get("hotel_recommendations") or [] if isinstance(h, dict)],
+                   [Dining.from_dict(f) for f in d.get("dining_recommendations") or [] if isinstance(f, dict)],
+                   _text(tips))
+
+    def to_dict(self):
+        """Back to the stored JSON schema."""
+        return {
+            "trip_title": self.trip_title, "travel_persona": self.travel_persona,
+            "total_estimated_cost": self.total_estimated_cost,
+            "days": [{"day": d.day, "activities": [
+                {"time": a.time, "activity": a.activity, "description": a.description, "location": a.location, "cost": a.cost}
+                for a in d.activities]} for d in self.days],
+            "hotel_recommendations": [{"name": h.name, "location": h.location, "rating": "" if h.rating is None else str(h.rating),
+                                       "price_per_night": h.price_per_night} for h in self.hotels],
+            "dining_recommendations": [{"name": f.name, "type": f.type, "location": f.location, "price": f.price} for f in self.dining],
+            "safety_tips": self.safety_tips,
+        }
+
+    def activity_costs(self):
+        """{'<day>_<index>': cost_inr} using the same keys as the UI checkboxes."""
+        return {f"{d.day}_{i}": a.cost_inr for d in self.days for i, a in enumerate(d.activities)}
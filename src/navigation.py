@@ -1,52 +1,67 @@
-import requests
-import streamlit as st
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+import os
+import logging
+from src import cache, geocode, metrics
+from src.config import cache_data
+from src.places import search_places, find_place
 
-# Unique user agent
-geolocator = Nominatim(user_agent="wanderlust_pro_v8_final", timeout=10)
+# Nominatim is asked unless the bundled gazetteer has an exact or prefix hit (set to 0 for fully offline)
+ONLINE_FALLBACK = os.getenv("WANDERLUST_PLACES_ONLINE", "1") == "1"
+LOGISTICS_VERSION = "v2"  # bump when place resolution changes so stale cached distances are not served
 
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
+@metrics.timed("suggestions")
 def get_place_suggestions(user_input):
     if not user_input or len(user_input) < 3: return []
+    local = [p.name for p in search_places(user_input)]
+    if not ONLINE_FALLBACK or search_places(user_input, limit=1, fuzzy=False): return local
+    # Typo matches only ('Mumbra' -> Mumbai): the real place may simply be missing from the gazetteer,
+    # and the UI preselects the first suggestion, so the geocoder's answers go first
     try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {'q': user_input, 'format': 'json', 'addressdetails': 1, 'limit': 5}
-        headers = {'User-Agent': "wanderlust_pro_v8_final"}
-        res = requests.get(url, params=params, headers=headers, timeout=2)
-        return [i.get('display_name') for i in res.json()]
-    except:
-        return []
+        online = [r["name"] for r in geocode.search(user_input, limit=5, timeout=2)]
+    except Exception as e:
+        metrics.inc("wanderlust_stage_errors_total", stage="suggestions", error=type(e).__name__)
+        logging.warning("place suggestions for %r failed: %s", user_input, e)
+        return local
+    return online + [n for n in local if n not in online]
 
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
 def get_coordinates(place_name):
-    try:
-        loc = geolocator.geocode(place_name)
-        if loc: return loc.latitude, loc.longitude
-    except: pass
-    return None
+    p = find_place(place_name)
+    if p:
+        metrics.inc("wanderlust_geocode_total", source="gazetteer")
+        return p.lat, p.lon
+    coords = geocode.geocode(place_name)
+    metrics.inc("wanderlust_geocode_total", source="geocoder" if coords else "miss")
+    return coords
+
+# Realistic cost per KM estimates: mode -> (base ₹, ₹ per km)
+TRANSPORT_RATES = {"flight": (4000, 10), "train": (500, 2), "bus": (300, 3), "car": (2000, 12)}
+INR_PER_USD = 84
 
 def calculate_costs(dist_km):
-    # Realistic cost per KM estimates
-    flight_inr = 4000 + (dist_km * 10)
-    train_inr = 500 + (dist_km * 2)
-    bus_inr = 300 + (dist_km * 3)
-    car_inr = 2000 + (dist_km * 12)
+    costs = {}
+    for mode, (base, per_km) in TRANSPORT_RATES.items():
+        inr = base + (dist_km * per_km)
+        costs[mode] = {"inr": int(inr), "usd": int(inr / INR_PER_USD)}
+    return costs
 
-    return {
-        "flight": {"inr": int(flight_inr), "usd": int(flight_inr / 84)},
-        "train": {"inr": int(train_inr), "usd": int(train_inr / 84)},
-        "bus": {"inr": int(bus_inr), "usd": int(bus_inr / 84)},
-        "car": {"inr": int(car_inr), "usd": int(car_inr / 84)}
-    }
+def logistics_cache_key(origin, destination):
+    return cache.make_key(origin=" ".join(str(origin).lower().split()), destination=" ".join(str(destination).lower().split()),
+                          version=LOGISTICS_VERSION)
 
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
+@metrics.timed("logistics")
 def get_trip_logistics(origin, destination):
+    key = logistics_cache_key(origin, destination)
+    cached = cache.safe_get("logistics", key)
+    if cached: return cached
+
     c1 = get_coordinates(origin)
     c2 = get_coordinates(destination)
     
     if not c1 or not c2: return None
 
+    from geopy.distance import geodesic  # deferred: not needed to render the first page
     # Guaranteed Distance
     dist_km = int(geodesic(c1, c2).km)
     
@@ -58,8 +73,10 @@ def get_trip_logistics(origin, destination):
     # Guaranteed Cost
     costs = calculate_costs(dist_km)
 
-    return {
+    result = {
         "distance_km": dist_km,
         "costs": costs,
         "times": {"flight": flight_time, "train": train_time, "car": drive_time}
-    }
\ No newline at end of file
+    }
+    cache.safe_put("logistics", key, result)
+    return result
\ No newline at end of file
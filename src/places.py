@@ -0,0 +1,113 @@
+# src/places.py
+# Offline place autocomplete over the bundled gazetteer (data/places.tsv, GeoNames-style columns).
+import bisect
+import os
+import unicodedata
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+GAZETTEER = os.getenv("WANDERLUST_GAZETTEER",
+                      os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "places.tsv"))
+MIN_SIMILARITY = 0.35  # trigram Jaccard needed for a typo match
+
+Place = namedtuple("Place", "name lat lon population")
+
+def normalize(text):
+    """ASCII-fold, lowercase, punctuation to spaces: 'Zürich,' -> 'zurich'."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode().lower()
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class PlaceIndex:
+    """
+    Array-backed index. Prefix search: bisect over a sorted list of every name, alias and word
+    suffix ('new delhi' is also findable as 'delhi'). Typo tolerance: trigram postings per alias.
+    Exact lookup only sees whole names and aliases, never suffixes ('York' is not New York).
+    """
+
+    def __init__(self, rows):
+        self.names = []
+        self.lat, self.lon, self.pop = array("d"), array("d"), array("q")
+        self.alias_place, self.alias_grams = array("I"), array("H")
+        prefix, postings, self.by_alias = [], {}, {}
+        for name, alts, admin, country, lat, lon, population in rows:
+            pid = len(self.names)
+            self.names.append(", ".join(p for p in (name, "" if admin == name else admin, country) if p))
+            self.lat.append(float(lat)); self.lon.append(float(lon)); self.pop.append(int(population or 0))
+            for alias in {normalize(a) for a in [name] + alts if a.strip()}:
+                self.by_alias.setdefault(alias, []).append(pid)
+                words = alias.split()
+                for j in range(len(words)): prefix.append((" ".join(words[j:]), pid))
+                aid = len(self.alias_place)
+                grams = _trigrams(alias)
+                self.alias_place.append(pid); self.alias_grams.append(len(grams))
+                for g in grams: postings.setdefault(g, array("I")).append(aid)
+        prefix.sort()
+        self.keys = [k for k, _ in prefix]
+        self.key_place = array("I", (p for _, p in prefix))
+        self.postings = postings
+        self.by_name = {n.lower(): i for i, n in enumerate(self.names)}
+
+    def __len__(self): return len(self.names)
+
+    def place(self, pid): return Place(self.names[pid], self.lat[pid], self.lon[pid], self.pop[pid])
+
+    def search(self, query, limit=5, fuzzy=True):
+        """Ranked places: exact name > prefix > typo match (unless fuzzy=False), ties broken by population."""
+        q = normalize(str(query).split(",")[0])
+        if len(q) < 2: return []
+        best = {}
+        lo = bisect.bisect_left(self.keys, q)
+        hi = bisect.bisect_left(self.keys, q + "\x7f")
+        for pos in range(lo, hi):
+            pid = self.key_place[pos]
+            best[pid] = max(best.get(pid, 0.0), 3.0 if self.keys[pos] == q else 2.0)
+        if fuzzy and len(best) < limit and len(q) >= 3:
+            qgrams = _trigrams(q)
+            shared = {}
+            for g in qgrams:
+                for aid in self.postings.get(g, ()): shared[aid] = shared.get(aid, 0) + 1
+            for aid, n in shared.items():
+                sim = n / (len(qgrams) + self.alias_grams[aid] - n)
+                pid = self.alias_place[aid]
+                if sim >= MIN_SIMILARITY and sim > best.get(pid, 0.0): best[pid] = sim
+        ranked = sorted(best, key=lambda pid: (best[pid], self.pop[pid]), reverse=True)
+        return [self.place(pid) for pid in ranked[:limit]]
+
+    def lookup(self, name):
+        """Exact display name (as returned by search) or exact place/alias name -> Place, else None."""
+        pid = self.by_name.get(str(name).strip().lower())
+        if pid is not None: return self.place(pid)
+        parts = [normalize(p) for p in str(name).split(",")]
+        # exact name/alias hits; every qualifier after the first comma ('Paris, Texas') must appear in the display name
+        hits = [self.place(pid) for pid in self.by_alias.get(parts[0], ())]
+        hits = [h for h in hits if all(p in normalize(h.name) for p in parts[1:])]
+        return max(hits, key=lambda h: h.population) if hits else None
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"): continue
+            name, alts, admin, country, lat, lon, population = line.rstrip("\n").split("\t")
+            yield name, [a for a in alts.split(",") if a], admin, country, lat, lon, population
+
+@lru_cache(maxsize=1)
+def get_index():
+    """Loaded on first use; an empty index if the gazetteer file is missing."""
+    try: return PlaceIndex(_read(GAZETTEER))
+    except FileNotFoundError: return PlaceIndex([])
+
+def search_places(query, limit=5, fuzzy=True): return get_index().search(query, limit, fuzzy)
+
+def find_place(name):
+    """
+    Exact gazetteer hit for a name, alias or display name; None otherwise (the caller geocodes).
+
+    >>> find_place("New Delhi") is not None, find_place("York") is None, find_place("Town") is None
+    (True, True, True)
+    """
+    return get_index().lookup(name)
@@ -0,0 +1,75 @@
+# src/ratelimit.py
+# In-process token buckets per provider (unconfigured ones are never throttled)
+# and a cross-process slot limiter for shared quotas such as Nominatim.
+import sqlite3
+import threading
+import time
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)          # tokens per second
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1.0):
+        """Block until `n` tokens are available; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return waited
+                delay = (n - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+_buckets = {}
+
+def configure(name, per_minute=None, per_second=None, burst=1):
+    """Limit `name` ("gemini", "groq", "gemini:gemini-2.0-flash", "nominatim", ...)."""
+    rate = per_second if per_second is not None else (per_minute or 0) / 60.0
+    if rate <= 0: _buckets.pop(name, None)
+    else: _buckets[name] = TokenBucket(rate, burst)
+
+def acquire(name):
+    """Throttle a call to provider `name`; a model-specific bucket wins over its family ("gemini:x" -> "gemini")."""
+    bucket = _buckets.get(name) or _buckets.get(name.split(":")[0])
+    return bucket.acquire() if bucket else 0.0
+
+class SharedLimiter:
+    """
+    One call per `interval` seconds across every thread *and process* using the same SQLite file.
+    Each caller reserves the next free slot in a single write transaction, then sleeps until it.
+    """
+
+    def __init__(self, name, interval, db_path):
+        self.name, self.interval, self.db_path = name, float(interval), db_path
+        self._ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._ready:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_slots (name TEXT PRIMARY KEY, next_at REAL)")
+            self._ready = True
+        return conn
+
+    def acquire(self):
+        """Block until this caller's slot; returns the seconds waited."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT next_at FROM rate_slots WHERE name=?", (self.name,)).fetchone()
+            now = time.time()
+            slot = max(now, row[0] if row else 0.0)
+            conn.execute("INSERT OR REPLACE INTO rate_slots (name, next_at) VALUES (?, ?)", (self.name, slot + self.interval))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        wait = slot - now
+        if wait > 0: time.sleep(wait)
+        return max(0.0, wait)
@@ -1,35 +1,151 @@
 # src/static_data.py
+# Offline knowledge base. Destinations in data/destinations.json get a plan built from their own
+# POIs, hotels and restaurants; anywhere else gets the generic themed template.
+import json
+import os
+from functools import lru_cache
+from src import metrics
+from src.places import normalize
 
-def get_smart_fallback(destination, duration, trip_type):
+CATALOG = os.getenv("WANDERLUST_CATALOG",
+                    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "destinations.json"))
+TIERS = ("Cheap", "Mid", "Lux")
+SLOTS = (("09:00", "morning"), ("14:00", "afternoon"), ("20:00", "evening"))
+# What each trip type tends to enjoy, on top of the interests the user picked
+TRIP_TYPE_TAGS = {"Solo": {"Adventure", "History"}, "Couple": {"Relaxation", "Food"},
+                  "Family": {"Nature", "History"}, "Friends": {"Nightlife", "Adventure"}}
+SAFETY_TIPS = "Keep emergency numbers saved and stay hydrated."
+
+# Diverse Themes to prevent "Day 1 Loop"
+THEMES = [
+    {"theme": "Arrival & Discovery", "act": "City Center Walk & Check-in", "desc": "Explore the main plaza and settle in."},
+    {"theme": "History & Culture", "act": "Museums & Ancient Forts", "desc": "Deep dive into local heritage."},
+    {"theme": "Nature & Parks", "act": "Botanical Gardens", "desc": "Relax amidst nature and greenery."},
+    {"theme": "Local Vibe", "act": "Market & Street Food", "desc": "Taste the authentic local flavors."},
+    {"theme": "Adventure", "act": "Hiking or Cycling Tour", "desc": "Get active with a city view."},
+    {"theme": "Art & Soul", "act": "Galleries & Workshops", "desc": "Experience the creative side."},
+    {"theme": "Shopping Spree", "act": "Grand Bazaar Visit", "desc": "Hunt for souvenirs and crafts."},
+    {"theme": "Relaxation", "act": "Spa or River Cruise", "desc": "Unwind and recharge."},
+    {"theme": "Hidden Gems", "act": "Off-beat Alleyways", "desc": "Discover the parts tourists miss."},
+    {"theme": "Departure", "act": "Final Views & Airport", "desc": "One last coffee before you go."}
+]
+
+# Rich Recommendations (Always Full)
+HOTELS = [
+    {"name": "Grand City Stay", "location": "Downtown", "price_per_night": "₹5,000 ($60)", "rating": "4.8"},
+    {"name": "The Backpackers Loft", "location": "Old Town", "price_per_night": "₹1,200 ($15)", "rating": "4.3"},
+    {"name": "Riverside Boutique", "location": "River Bank", "price_per_night": "₹8,000 ($95)", "rating": "4.7"},
+    {"name": "City Center Inn", "location": "Main Plaza", "price_per_night": "₹3,500 ($42)", "rating": "4.0"},
+    {"name": "Heritage Haveli", "location": "Historic District", "price_per_night": "₹6,000 ($72)", "rating": "4.6"}
+]
+
+FOOD = [
+    {"name": "The Golden Spoon", "type": "Fine Dining", "location": "City Center", "price": "₹2,500 ($30)"},
+    {"name": "Street Flavors", "type": "Snacks", "location": "Market", "price": "₹200 ($3)"},
+    {"name": "Cafe Sol", "type": "Coffee & Brunch", "location": "Art District", "price": "₹600 ($7)"},
+    {"name": "Mama's Kitchen", "type": "Traditional", "location": "Old Town", "price": "₹1,200 ($15)"},
+    {"name": "Spice Route", "type": "Curry House", "location": "Main St", "price": "₹900 ($11)"}
+]
+
+class Catalog:
     """
-    Generates a rich, non-repetitive itinerary when AI is offline.
+    Destination entries exactly as stored (POIs, hotels and dining stay compact row lists),
+    plus one dict from every normalised name and alias to its entry.
     """
-    days = []
-    
-    # Diverse Themes to prevent "Day 1 Loop"
-    themes = [
-        {"theme": "Arrival & Discovery", "act": "City Center Walk & Check-in", "desc": "Explore the main plaza and settle in."},
-        {"theme": "History & Culture", "act": "Museums & Ancient Forts", "desc": "Deep dive into local heritage."},
-        {"theme": "Nature & Parks", "act": "Botanical Gardens", "desc": "Relax amidst nature and greenery."},
-        {"theme": "Local Vibe", "act": "Market & Street Food", "desc": "Taste the authentic local flavors."},
-        {"theme": "Adventure", "act": "Hiking or Cycling Tour", "desc": "Get active with a city view."},
-        {"theme": "Art & Soul", "act": "Galleries & Workshops", "desc": "Experience the creative side."},
-        {"theme": "Shopping Spree", "act": "Grand Bazaar Visit", "desc": "Hunt for souvenirs and crafts."},
-        {"theme": "Relaxation", "act": "Spa or River Cruise", "desc": "Unwind and recharge."},
-        {"theme": "Hidden Gems", "act": "Off-beat Alleyways", "desc": "Discover the parts tourists miss."},
-        {"theme": "Departure", "act": "Final Views & Airport", "desc": "One last coffee before you go."}
-    ]
 
+    def __init__(self, doc):
+        self.destinations = doc.get("destinations", [])
+        self.by_key = {}
+        for i, d in enumerate(self.destinations):
+            for name in [d["name"]] + d.get("aliases", []): self.by_key.setdefault(normalize(name), i)
+
+    def __len__(self): return len(self.destinations)
+
+    def find(self, destination):
+        """
+        'Manali, Himachal Pradesh, India' -> the Manali entry. Only the place name (the first comma part)
+        is matched: 'Munnar, Kerala' must not turn into another Kerala city's plan. None if unknown.
+        """
+        i = self.by_key.get(normalize(str(destination).split(",")[0]))
+        return None if i is None else self.destinations[i]
+
+@lru_cache(maxsize=1)
+def get_catalog():
+    """Loaded on first fallback; an empty catalog if the data file is missing."""
+    try:
+        with open(CATALOG, encoding="utf-8") as f: return Catalog(json.load(f))
+    except FileNotFoundError:
+        return Catalog({})
+
+def _inr(amount): return f"₹{amount:,}" if amount else "Free"
+
+def _tier_distance(tier, budget):
+    return abs(TIERS.index(tier) - TIERS.index(budget)) if tier in TIERS and budget in TIERS else 1
+
+def _catalog_plan(entry, destination, duration, trip_type, budget, interests):
+    wanted, liked = set(interests), TRIP_TYPE_TAGS.get(trip_type, set())
+
+    def score(poi):
+        tags = set(poi[2].split("|"))
+        s = 3 * len(tags & wanted) + len(tags & liked)
+        if budget == "Cheap" and poi[3] > 3000: s -= 2  # pricey excursions sink on a tight budget
+        return s
+
+    pois = sorted(entry["pois"], key=score, reverse=True)  # stable: ties keep the file's order
+    hotels = sorted(entry["hotels"], key=lambda h: (_tier_distance(h[2], budget), -h[4]))[:3]
+    dining = sorted(entry["dining"], key=lambda f: (_tier_distance(f[3], budget), f[4]))[:4]
+    place = entry["name"]
+
+    def take(slot):
+        for i, poi in enumerate(pois):
+            if poi[4] in (slot, "any"): return pois.pop(i)
+        return pois.pop(0) if pois else None
+
+    days, spent = [], 0
+    for d in range(1, duration + 1):
+        acts, day_cost = [], 0
+        theme = THEMES[(d % (len(THEMES) - 2)) + 1]  # filler once the catalog runs out on long trips
+        for time, slot in SLOTS:
+            if d == 1 and slot == "morning" and hotels:
+                acts.append({"time": time, "activity": f"Arrival & Check-in at {hotels[0][0]}",
+                             "description": "Drop your bags and get your bearings.", "location": f"{hotels[0][1]}, {place}", "cost": "Free"})
+            elif d == duration > 1 and slot == "evening":
+                acts.append({"time": time, "activity": "Departure", "description": THEMES[-1]["desc"], "location": place, "cost": "Free"})
+            elif poi := take(slot):
+                name, area, _, cost, _, desc = poi
+                acts.append({"time": time, "activity": name, "description": desc, "location": f"{area}, {place}", "cost": _inr(cost)})
+                day_cost += cost
+            else:
+                acts.append({"time": time, "activity": f"{theme['theme']}: {slot.title()}", "description": theme["desc"],
+                             "location": place, "cost": "Free"})
+        days.append({"day": d, "daily_total": _inr(day_cost), "activities": acts})
+        spent += day_cost
+
+    nights = max(1, duration - 1)
+    meals = 2 * duration * (sum(f[4] for f in dining) // max(1, len(dining)))
+    total = spent + (hotels[0][3] * nights if hotels else 0) + meals
+    return {
+        "trip_title": f"The Ultimate {destination} Experience",
+        "travel_persona": f"The {trip_type} Explorer",
+        "total_estimated_cost": _inr(total),
+        "days": days,
+        "hotel_recommendations": [{"name": n, "location": a, "price_per_night": _inr(p), "rating": str(r)} for n, a, _, p, r in hotels],
+        "dining_recommendations": [{"name": n, "type": t, "location": a, "price": _inr(p)} for n, t, a, _, p in dining],
+        "safety_tips": SAFETY_TIPS,
+    }
+
+def _generic_plan(destination, duration, trip_type):
+    days = []
     for i in range(1, duration + 1):
         # Pick a unique theme based on the day number
         if i == 1:
-            t = themes[0] # Always Arrival
+            t = THEMES[0] # Always Arrival
         elif i == duration:
-            t = themes[-1] # Always Departure
+            t = THEMES[-1] # Always Departure
         else:
             # Cycle through middle themes
-            t = themes[(i % (len(themes) - 2)) + 1]
-            
+            t = THEMES[(i % (len(THEMES) - 2)) + 1]
+
         days.append({
             "day": i,
             "daily_total": f"₹{3000 + (i*200)}",
@@ -40,29 +156,30 @@ def get_smart_fallback(destination, duration, trip_type):
             ]
         })
 
-    # Rich Recommendations (Always Full)
-    hotels = [
-        {"name": "Grand City Stay", "location": "Downtown", "price_per_night": "₹5,000 ($60)", "rating": "4.8"},
-        {"name": "The Backpackers Loft", "location": "Old Town", "price_per_night": "₹1,200 ($15)", "rating": "4.3"},
-        {"name": "Riverside Boutique", "location": "River Bank", "price_per_night": "₹8,000 ($95)", "rating": "4.7"},
-        {"name": "City Center Inn", "location": "Main Plaza", "price_per_night": "₹3,500 ($42)", "rating": "4.0"},
-        {"name": "Heritage Haveli", "location": "Historic District", "price_per_night": "₹6,000 ($72)", "rating": "4.6"}
-    ]
-    
-    food = [
-        {"name": "The Golden Spoon", "type": "Fine Dining", "location": "City Center", "price": "₹2,500 ($30)"},
-        {"name": "Street Flavors", "type": "Snacks", "location": "Market", "price": "₹200 ($3)"},
-        {"name": "Cafe Sol", "type": "Coffee & Brunch", "location": "Art District", "price": "₹600 ($7)"},
-        {"name": "Mama's Kitchen", "type": "Traditional", "location": "Old Town", "price": "₹1,200 ($15)"},
-        {"name": "Spice Route", "type": "Curry House", "location": "Main St", "price": "₹900 ($11)"}
-    ]
-
     return {
         "trip_title": f"The Ultimate {destination} Experience",
         "travel_persona": f"The {trip_type} Explorer",
         "total_estimated_cost": f"₹{duration * 5000}",
         "days": days,
-        "hotel_recommendations": hotels,
-        "dining_recommendations": food,
-        "safety_tips": "Keep emergency numbers saved and stay hydrated."
-    }
\ No newline at end of file
+        "hotel_recommendations": HOTELS,
+        "dining_recommendations": FOOD,
+        "safety_tips": SAFETY_TIPS
+    }
+
+@lru_cache(maxsize=512)
+def _fallback_json(destination, duration, trip_type, budget, interests):
+    entry = get_catalog().find(destination)
+    if entry: plan = _catalog_plan(entry, destination, duration, trip_type, budget, interests)
+    else: plan = _generic_plan(destination, duration, trip_type)
+    return json.dumps(plan, ensure_ascii=False)
+
+@metrics.timed("fallback")
+def get_smart_fallback(destination, duration, trip_type, budget="Mid", interests=()):
+    """
+    Generates a rich, non-repetitive itinerary when AI is offline: destination-specific for places
+    in the bundled catalog (POIs ranked by interests and trip type, hotels/dining by budget tier).
+    Memoised per (destination, duration, trip_type, budget, interests); callers get a fresh copy.
+    """
+    key = (str(destination), int(duration), trip_type, budget or "Mid", tuple(sorted(set(interests or ()))))
+    metrics.inc("wanderlust_fallback_total", kind="catalog" if get_catalog().find(key[0]) else "generic")
+    return json.loads(_fallback_json(*key))